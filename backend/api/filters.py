@@ -1,33 +1,65 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Recipe
+from recipes.search import search
+from recipes.tag_map import tag_map
 
 User = get_user_model()
 
 
-class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='startswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ['name']
+def tag_choices():
+    return [(slug, slug) for slug in tag_map.snapshot()]
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags'
     )
 
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ('popular', 'Популярные'),
+            ('trending', 'Набирающие популярность'),
+            ('cooking_time', 'По времени приготовления'),
+        ),
+        method='filter_ordering'
+    )
+
+    ORDERINGS = {
+        'popular': ('-favorites_count', '-id'),
+        'trending': ('-trending_score', '-id'),
+        'cooking_time': ('cooking_time', '-id'),
+    }
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author')
 
+    def __init__(self, data=None, *args, **kwargs):
+        # Resolving the slugs first refreshes the tag map when they include
+        # a tag created in another worker, before the choices are built.
+        if data is not None and data.getlist('tags'):
+            tag_map.ids(data.getlist('tags'))
+        super().__init__(data, *args, **kwargs)
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        # EXISTS over the (recipe, tag) unique index instead of a join, so a
+        # recipe matching several tags is returned once without DISTINCT.
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=tag_map.ids(value)
+            )
+        ))
+
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
             return queryset.filter(favorites__user=self.request.user)
@@ -37,3 +69,9 @@ class RecipeFilter(FilterSet):
         if value and not self.request.user.is_anonymous:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
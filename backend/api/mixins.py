@@ -0,0 +1,30 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    vary_headers = ()
+
+    def get_version(self):
+        raise NotImplementedError(
+            'ConditionalGetMixin.get_version() must be implemented.'
+        )
+
+    def conditional_response(self, request, view, *args, **kwargs):
+        version, last_modified = self.get_version()
+        etag = quote_etag(hashlib.md5(
+            f'{version}:{request.accepted_renderer.format}'.encode()
+        ).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, self.vary_headers)
+        return response
@@ -1,5 +1,143 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 6
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    max_count = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, queryset):
+        # Explicit orderings (e.g. ?ordering=popular) are kept and the whole
+        # ordering becomes the key, with the primary key as the tie breaker.
+        ordering = tuple(
+            field for field in queryset.query.order_by
+            if isinstance(field, str)
+        ) or self.ordering
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id',)
+        return ordering
+
+    def encode_cursor(self, instance, reverse):
+        cursor = {
+            'values': [
+                getattr(instance, field.lstrip('-'))
+                for field in self.ordering_fields
+            ],
+            'reverse': reverse,
+        }
+        encoded = b64encode(
+            json.dumps(cursor, default=str).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode()).decode())
+            values, reverse = cursor['values'], bool(cursor['reverse'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or (
+            len(values) != len(self.ordering_fields)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    @staticmethod
+    def after(ordering, values):
+        # (a, b) after (x, y) is a > x OR (a = x AND b > y), with the
+        # comparison flipped for descending fields.
+        condition = Q()
+        for index, (field, value) in enumerate(zip(ordering, values)):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(
+                **{
+                    previous.lstrip('-'): previous_value
+                    for previous, previous_value in zip(
+                        ordering[:index], values[:index]
+                    )
+                },
+                **{f'{name}__{lookup}': value}
+            )
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param):
+            # Counting is capped, so it costs at most max_count index entries
+            # instead of a full scan of the filtered join.
+            self.count = queryset.order_by()[:self.max_count + 1].count()
+        self.base_url = request.build_absolute_uri()
+        self.ordering_fields = self.get_ordering(queryset)
+        values, reverse = self.decode_cursor(request)
+        ordering = self.ordering_fields
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.after(ordering, values))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        self.next = (
+            self.encode_cursor(results[-1], False)
+            if has_next and results else None
+        )
+        self.previous = (
+            self.encode_cursor(results[0], True)
+            if has_previous and results else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.next),
+            ('previous', self.previous),
+            ('results', data),
+        ])
+        if self.count is not None:
+            response['count'] = min(self.count, self.max_count)
+            response['count_is_exact'] = self.count <= self.max_count
+        return Response(response)
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 6
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,115 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            return '\n'.join(
+                str(value) for value in data.values()
+            ).encode(self.charset or 'utf-8')
+        return b''.join(self.stream(data))
+
+    def stream(self, ingredients):
+        raise NotImplementedError(
+            'ShoppingListRenderer.stream() must be implemented.'
+        )
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield SHOPPING_LIST_TITLE.encode(self.charset)
+        for ingredient in ingredients:
+            yield (
+                f'\n- {ingredient["name"]} '
+                f'({ingredient["measurement_unit"]})'
+                f' - {ingredient["amount"]}'
+            ).encode(self.charset)
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Единица измерения', 'Количество')
+        ).encode(self.charset)
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['name'],
+                ingredient['measurement_unit'],
+                ingredient['amount'],
+            )).encode(self.charset)
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    chunk_size = 64 * 1024
+    font_name = 'ShoppingListFont'
+
+    def get_font(self):
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        font_path = getattr(settings, 'SHOPPING_LIST_PDF_FONT', None)
+        if not font_path or not os.path.exists(font_path):
+            return 'Helvetica'
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(self.font_name, font_path))
+        return self.font_name
+
+    def stream(self, ingredients):
+        # reportlab is only needed for this format, so it is imported lazily.
+        # PDF needs a cross-reference table at the end of the file, so the
+        # document is assembled in a buffer and sent out in chunks.
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen.canvas import Canvas
+
+        buffer = io.BytesIO()
+        canvas = Canvas(buffer, pagesize=A4)
+        font = self.get_font()
+        width, height = A4
+        margin, line_height = 50, 18
+        y = height - margin
+        canvas.setFont(font, 16)
+        canvas.drawString(margin, y, SHOPPING_LIST_TITLE)
+        canvas.setFont(font, 12)
+        for ingredient in ingredients:
+            y -= line_height
+            if y < margin:
+                canvas.showPage()
+                canvas.setFont(font, 12)
+                y = height - margin
+            canvas.drawString(
+                margin, y,
+                f'- {ingredient["name"]} '
+                f'({ingredient["measurement_unit"]})'
+                f' - {ingredient["amount"]}'
+            )
+        canvas.save()
+        buffer.seek(0)
+        while chunk := buffer.read(self.chunk_size):
+            yield chunk
@@ -0,0 +1,18 @@
+from django.core.exceptions import ValidationError
+from rest_framework.fields import IntegerField, ListField
+from rest_framework.serializers import Serializer
+
+BULK_MAX_IDS = 100
+
+
+class BulkIdsSerializer(Serializer):
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_IDS
+    )
+
+    def validate_ids(self, ids):
+        if len(set(ids)) != len(ids):
+            raise ValidationError('Идентификаторы не должны повторяться')
+        return ids
@@ -0,0 +1,25 @@
+from drf_extra_fields.fields import Base64ImageField
+from recipes.images import thumbnail_name
+
+
+class ThumbnailImageField(Base64ImageField):
+
+    def __init__(self, size, *args, **kwargs):
+        self.size = size
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        # Images whose thumbnails were not generated are served as uploaded.
+        version = getattr(value.instance, 'thumbnail_version', '')
+        if version:
+            url = value.storage.url(
+                thumbnail_name(value.name, self.size, version)
+            )
+        else:
+            url = value.url
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
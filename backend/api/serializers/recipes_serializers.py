@@ -1,10 +1,15 @@
 import recipes.models
 import rest_framework
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField, IntegerField
+from recipes.user_sets import get_user_sets
 
+from .fields import ThumbnailImageField
 from .users_serializers import CustomUserSerializer
 
 User = get_user_model()
@@ -27,7 +32,7 @@ class TagSerializer(rest_framework.serializers.ModelSerializer):
 
 
 class RecipePreviewSerializer(rest_framework.serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = ThumbnailImageField(size='preview')
 
     class Meta:
         model = recipes.models.Recipe
@@ -60,18 +65,25 @@ class RecipeIngredientReadSerializer(
         )
 
 
+class CachedRecipeListSerializer(rest_framework.serializers.ListSerializer):
+    def to_representation(self, data):
+        if hasattr(data, 'all'):
+            data = data.all()
+        return self.child.represent_many(list(data))
+
+
 class RecipeReadSerializer(rest_framework.serializers.ModelSerializer):
+    user_fields = ('author', 'is_favorited', 'is_in_shopping_cart')
+
     tags = TagSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientReadSerializer(
         many=True,
         source='ingredient_in_recipe'
     )
-    is_favorited = rest_framework.fields.SerializerMethodField(read_only=True)
-    is_in_shopping_cart = rest_framework.fields.SerializerMethodField(
-        read_only=True
-    )
-    image = Base64ImageField()
+    is_favorited = rest_framework.fields.SerializerMethodField()
+    is_in_shopping_cart = rest_framework.fields.SerializerMethodField()
+    image = ThumbnailImageField(size='detail')
 
     class Meta:
         model = recipes.models.Recipe
@@ -87,18 +99,92 @@ class RecipeReadSerializer(rest_framework.serializers.ModelSerializer):
             'text',
             'cooking_time',
         )
+        list_serializer_class = CachedRecipeListSerializer
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favorites.filter(recipe=obj).exists()
+        favorites, = get_user_sets(self.context['request'], 'favorites')
+        return obj.pk in favorites
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.shopping_cart.filter(recipe=obj).exists()
+        shopping_cart, = get_user_sets(
+            self.context['request'], 'shopping_cart'
+        )
+        return obj.pk in shopping_cart
+
+    def cache_key(self, recipe):
+        request = self.context.get('request')
+        base_url = request.build_absolute_uri('/') if request else ''
+        return (
+            f'recipe:{recipe.pk}:{recipe.updated_at.timestamp()}:'
+            f'{self.fields["image"].size}:{base_url}'
+        )
+
+    def to_cached_representation(self, recipe):
+        return {
+            field.field_name: field.to_representation(
+                field.get_attribute(recipe)
+            )
+            for field in self._readable_fields
+            if field.field_name not in self.user_fields
+        }
+
+    def represent_many(self, recipes_list):
+        # Everything but the per-user part is the same for all readers, so
+        # it is cached per recipe version. The author and the flags are
+        # looked up in the reader's cached id sets, loaded once up front.
+        get_user_sets(
+            self.context['request'],
+            'favorites', 'shopping_cart', 'subscriptions'
+        )
+        keys = {recipe.pk: self.cache_key(recipe) for recipe in recipes_list}
+        cached = cache.get_many(keys.values())
+        missing = [
+            recipe for recipe in recipes_list if keys[recipe.pk] not in cached
+        ]
+        if missing:
+            prefetch_related_objects(
+                missing, *recipes.models.content_prefetches()
+            )
+            fresh = {
+                keys[recipe.pk]: self.to_cached_representation(recipe)
+                for recipe in missing
+            }
+            cache.set_many(fresh, settings.RECIPE_CACHE_TIMEOUT)
+            cached.update(fresh)
+        fields = self.fields
+        return [
+            {
+                name: (
+                    fields[name].to_representation(
+                        fields[name].get_attribute(recipe)
+                    )
+                    if name in self.user_fields
+                    else cached[keys[recipe.pk]][name]
+                )
+                for name in self.Meta.fields
+            }
+            for recipe in recipes_list
+        ]
+
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+
+class RecipeListSerializer(RecipeReadSerializer):
+    image = ThumbnailImageField(size='card')
+
+
+class PantrySerializer(rest_framework.serializers.Serializer):
+    ingredients = rest_framework.fields.ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=200
+    )
+    limit = IntegerField(min_value=1, max_value=100, default=20)
+
+
+class ShoppingCartSerializer(rest_framework.serializers.Serializer):
+    servings = IntegerField(min_value=1, max_value=100, default=1)
 
 
 class RecipeIngredientListSerializer(
@@ -112,36 +198,13 @@ class RecipeIngredientListSerializer(
         ingredient_ids = [item['id'] for item in data]
         if len(set(ingredient_ids)) != len(ingredient_ids):
             raise ValidationError('Ингредиенты должны быть уникальными')
+        existing_count = recipes.models.Ingredient.objects.filter(
+            id__in=ingredient_ids
+        ).count()
+        if existing_count != len(ingredient_ids):
+            raise ValidationError('Ингредиента не существует')
         return data
 
-    def create(self, validated_data):
-        recipe_ingredients = []
-        for item in validated_data:
-            ingredient_id = item['id']
-            amount = item['amount']
-            recipe_ingredients.append(
-                recipes.models.RecipeIngredient(
-                    ingredient_id=ingredient_id,
-                    amount=amount
-                )
-            )
-        return recipes.models.RecipeIngredient.objects.bulk_create(
-            recipe_ingredients
-        )
-
-    def update(self, instance, validated_data):
-        instance_mapping = {item.id: item for item in instance}
-        data_mapping = {item['id']: item for item in validated_data}
-
-        for ingredient_id, data in data_mapping.items():
-            instance_item = instance_mapping.get(ingredient_id, None)
-            if instance_item is not None:
-                self.child.update(instance_item, data)
-        for ingredient_id, instance_item in instance_mapping.items():
-            if ingredient_id not in data_mapping:
-                instance_item.delete()
-        return instance
-
 
 class RecipeIngredientWriteSerializer(
     rest_framework.serializers.ModelSerializer
@@ -161,13 +224,6 @@ class TagListSerializer(rest_framework.serializers.ListSerializer):
             raise ValidationError('Теги должны быть уникальными')
         return data
 
-    def create(self, validated_data):
-        tags = [
-            recipes.models.Tag.objects.get(id=item)
-            for item in validated_data
-        ]
-        return recipes.models.Tag.objects.bulk_create(tags)
-
 
 class RecipeWriteSerializer(rest_framework.serializers.ModelSerializer):
     tags = TagListSerializer(
@@ -199,16 +255,11 @@ class RecipeWriteSerializer(rest_framework.serializers.ModelSerializer):
             raise ValidationError({
                 'tags': 'Нужно выбрать хотя бы оин тэг'
             })
-        valid_tags = []
-        for tag in tags:
-            if not recipes.models.Tag.objects.filter(id__in=tags).exists():
-                raise ValidationError('Тега не сущестует')
-            if tag in valid_tags:
-                raise ValidationError('Теги не должы повторяться')
-            valid_tags.append(tag)
-        return tags
+        existing_tags = recipes.models.Tag.objects.in_bulk(tags)
+        if len(existing_tags) != len(tags):
+            raise ValidationError('Тега не сущестует')
+        return [existing_tags[tag_id] for tag_id in tags]
 
-    @transaction.atomic
     def create_ingredients_amount(self, ingredients, recipe):
         recipe_ingredients = [
             recipes.models.RecipeIngredient(
@@ -225,27 +276,56 @@ class RecipeWriteSerializer(rest_framework.serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = recipes.models.Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+        recipe.tags.add(*tags)
         self.create_ingredients_amount(
             ingredients=ingredients, recipe=recipe
         )
         return recipe
 
+    def update_ingredients_amount(self, ingredients, recipe):
+        current = {
+            item.ingredient_id: item
+            for item in recipe.ingredient_in_recipe.all()
+        }
+        changed = []
+        added = []
+        for ingredient in ingredients:
+            item = current.pop(ingredient['id'], None)
+            if item is None:
+                added.append(ingredient)
+            elif item.amount != ingredient['amount']:
+                item.amount = ingredient['amount']
+                changed.append(item)
+        if current:
+            recipes.models.RecipeIngredient.objects.filter(
+                id__in=[item.id for item in current.values()]
+            ).delete()
+        if changed:
+            recipes.models.RecipeIngredient.objects.bulk_update(
+                changed, ['amount']
+            )
+        if added:
+            self.create_ingredients_amount(ingredients=added, recipe=recipe)
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
         instance = super().update(instance, validated_data)
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients_amount(
-            ingredients=ingredients, recipe=instance
-        )
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients_amount(
+                ingredients=ingredients, recipe=instance
+            )
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {"request": request}
+        instance = recipes.models.Recipe.objects.for_read().get(
+            pk=instance.pk
+        )
         return RecipeReadSerializer(
             instance, context=context
         ).data
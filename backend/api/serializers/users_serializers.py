@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 # from django.db import models
 from djoser.serializers import (PasswordSerializer, UserCreateSerializer,
                                 UserSerializer)
+from recipes.user_sets import get_user_sets
 from rest_framework.fields import CharField, SerializerMethodField
 from users.models import Subscription
 
@@ -24,10 +25,12 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        subscriptions, = get_user_sets(
+            self.context.get('request'), 'subscriptions'
+        )
+        return obj.pk in subscriptions
 
 
 class SubscriptionSerializer(CustomUserSerializer):
@@ -57,18 +60,13 @@ class SubscriptionSerializer(CustomUserSerializer):
 
     def get_recipes(self, obj):
         from api.serializers.recipes_serializers import RecipePreviewSerializer
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
         serializer = RecipePreviewSerializer(
-            recipes, many=True, read_only=True
+            obj.recipes_preview, many=True, read_only=True
         )
         return serializer.data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
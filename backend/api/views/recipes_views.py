@@ -1,43 +1,93 @@
 import django.contrib.auth
 import django.db.models
+from api.filters import RecipeFilter
+from api.mixins import ConditionalGetMixin
+from api.negotiation import FormatOrDefaultContentNegotiation
+from api.pagination import CustomPagination
+from api.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
+from api.renderers import (CSVShoppingListRenderer, PDFShoppingListRenderer,
+                           TextShoppingListRenderer)
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
-                            Tag, UsersRecipes)
+from recipes.autocomplete import ingredient_index
+from recipes.models import Favorites, Ingredient, Recipe, Tag, UsersRecipes
+from recipes.pantry import pantry_index
+from recipes.relations import add_relations, change_relations, remove_relations
+from recipes.shopping_list import get_shopping_list
+from recipes.user_sets import get_user_sets
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.fields import BooleanField
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import CustomPagination
-from api.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-
-from ..serializers import recipes_serializers
+from ..serializers import bulk_serializers, recipes_serializers
 
 User = django.contrib.auth.get_user_model()
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class ReferenceDataViewSet(ConditionalGetMixin,
+                           viewsets.ReadOnlyModelViewSet):
+    vary_headers = ('Accept',)
+
+    def get_version(self):
+        # No Last-Modified: deleting a row does not move Max(updated_at)
+        # forward, only the count in the ETag notices it.
+        version = self.queryset.model.objects.aggregate(
+            count=django.db.models.Count('id'),
+            last_modified=django.db.models.Max('updated_at'),
+        )
+        return f'{version["count"]}:{version["last_modified"]}', None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class IngredientViewSet(ReferenceDataViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = recipes_serializers.IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (
-        DjangoFilterBackend,
-    )
-    filterset_class = IngredientFilter
 
+    def get_version(self):
+        if self.action == 'list' and self.request.query_params.get('name'):
+            return ingredient_index.version(), None
+        return super().get_version()
+
+    def search(self, request, name):
+        # Contains matches are opt-in: on short prefixes they would return
+        # most of the table on every keystroke.
+        contains = request.query_params.get('contains') in (
+            BooleanField.TRUE_VALUES
+        )
+        serializer = self.get_serializer(
+            ingredient_index.search(name, contains=contains), many=True
+        )
+        return Response(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(request, self.search, name)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(ReferenceDataViewSet):
     queryset = Tag.objects.all()
     serializer_class = recipes_serializers.TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    vary_headers = ('Accept', 'Authorization')
     permission_classes = (IsAuthorOrReadOnly | IsAdminOrReadOnly,)
     pagination_class = CustomPagination
     filter_backends = (
@@ -45,22 +95,59 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.action in ('update', 'partial_update'):
+            return Recipe.objects.prefetch_related('ingredient_in_recipe')
+        return Recipe.objects.for_read()
+
     def get_serializer_class(self):
+        if self.action == 'list':
+            return recipes_serializers.RecipeListSerializer
         if self.request.method in SAFE_METHODS:
             return recipes_serializers.RecipeReadSerializer
         return recipes_serializers.RecipeWriteSerializer
 
+    def get_version(self):
+        recipe = get_object_or_404(
+            Recipe.objects.values_list(
+                'id',
+                'updated_at',
+                'author_id',
+                'author__email',
+                'author__username',
+                'author__first_name',
+                'author__last_name',
+            ),
+            pk=self.kwargs['pk']
+        )
+        favorites, shopping_cart, subscriptions = get_user_sets(
+            self.request, 'favorites', 'shopping_cart', 'subscriptions'
+        )
+        recipe_id, author_id = recipe[0], recipe[2]
+        version = (
+            *recipe,
+            recipe_id in favorites,
+            recipe_id in shopping_cart,
+            author_id in subscriptions,
+        )
+        # Флаги зависят от пользователя, поэтому Last-Modified не отдаём.
+        return version, None
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
     def perform_create(self, serializer):
         author = self.request.user
         serializer.save(author=author)
 
-    def add_item(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+    def add_item(self, model, user, pk, **fields):
+        recipe = get_object_or_404(Recipe, id=pk)
+        if not add_relations(model, user, [recipe.id], **fields):
             return Response(
                 status=status.HTTP_400_BAD_REQUEST
             )
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
         serializer = recipes_serializers.RecipePreviewSerializer(recipe)
         return Response(
             serializer.data,
@@ -68,9 +155,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     def delete_item(self, model, user, pk):
-        item = model.objects.filter(user=user, recipe__id=pk)
-        if item.exists():
-            item.delete()
+        if remove_relations(model, user, [pk]):
             return Response(
                 status=status.HTTP_204_NO_CONTENT
             )
@@ -90,47 +175,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=True,
-        methods=['post', 'delete'],
+        methods=['post', 'patch', 'delete'],
         permission_classes=[IsAuthenticated]
     )
     def shopping_cart(self, request, pk):
+        if request.method == 'DELETE':
+            return self.delete_item(UsersRecipes, request.user, pk)
+        serializer = recipes_serializers.ShoppingCartSerializer(
+            data=request.data
+        )
+        serializer.is_valid(raise_exception=True)
+        servings = serializer.validated_data['servings']
         if request.method == 'POST':
             return self.add_item(
                 UsersRecipes,
                 request.user,
-                pk
+                pk,
+                servings=servings
             )
-        return self.delete_item(UsersRecipes, request.user, pk)
+        item = get_object_or_404(
+            UsersRecipes, user=request.user, recipe_id=pk
+        )
+        item.servings = servings
+        item.save(update_fields=['servings'])
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def pantry(self, request):
+        serializer = recipes_serializers.PantrySerializer(
+            data=request.query_params
+        )
+        serializer.is_valid(raise_exception=True)
+        matches = pantry_index.search(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data['limit']
+        )
+        recipes = Recipe.objects.for_read().in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        matches = [match for match in matches if match[0] in recipes]
+        data = recipes_serializers.RecipeListSerializer(
+            [recipes[recipe_id] for recipe_id, _, _ in matches],
+            many=True,
+            context=self.get_serializer_context()
+        ).data
+        return Response([
+            {**recipe, 'matched_ingredients': matched,
+             'missing_ingredients': missing}
+            for recipe, (_, matched, missing) in zip(data, matches)
+        ])
+
+    def bulk_items(self, model, request):
+        serializer = bulk_serializers.BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = change_relations(
+            model,
+            request.user,
+            serializer.validated_data['ids'],
+            add=request.method == 'POST'
+        )
+        return Response({'results': results})
 
     @action(
         detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite/bulk',
         permission_classes=[IsAuthenticated]
     )
+    def favorite_bulk(self, request):
+        return self.bulk_items(Favorites, request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart/bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_items(UsersRecipes, request)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            TextShoppingListRenderer,
+            CSVShoppingListRenderer,
+            PDFShoppingListRenderer,
+        ],
+        content_negotiation_class=FormatOrDefaultContentNegotiation,
+    )
     def download_shopping_cart(self, request):
         user = request.user
-        if not user.shopping_cart.exists():
+        ingredients = get_shopping_list(user)
+        if ingredients is None:
             return Response(
                 status=status.HTTP_400_BAD_REQUEST
             )
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=django.db.models.Sum('amount'))
-
-        shopping_list = ('Список покупок:\n')
-        shopping_list += '\n'.join([
-            f'- {ingredient["ingredient__name"]} '
-            f'({ingredient["ingredient__measurement_unit"]})'
-            f' - {ingredient["amount"]}'
-            for ingredient in ingredients
-        ])
 
-        filename = f'{user.username}_shopping_list.txt'
-        response = HttpResponse(
-            shopping_list,
-            content_type='text/plain'
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        filename = f'{user.username}_shopping_list.{renderer.format}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=content_type
         )
         response['Content-Disposition'] = f'attachment; filename={filename}'
 
@@ -1,14 +1,18 @@
 from django.contrib.auth import get_user_model
+from django.db.models import BooleanField, Prefetch, Value
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
+from recipes.models import Recipe
+from recipes.relations import change_relations
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from users.models import Subscription
 
 from ..pagination import CustomPagination
-from ..serializers import users_serializers
+from ..serializers import bulk_serializers, users_serializers
 
 User = get_user_model()
 
@@ -18,6 +22,17 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = users_serializers.CustomUserSerializer
     pagination_class = CustomPagination
 
+    def with_recipes_preview(self, queryset):
+        recipes = Recipe.objects.all()
+        limit = self.request.query_params.get('recipes_limit')
+        if limit:
+            recipes = recipes.limit_per_author(int(limit))
+        return queryset.annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='recipes_preview')
+        )
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -26,7 +41,10 @@ class CustomUserViewSet(UserViewSet):
     def subscribe(self, request, **kwargs):
         user = request.user
         author_id = self.kwargs.get('id')
-        author = get_object_or_404(User, id=author_id)
+        author = get_object_or_404(
+            self.with_recipes_preview(User.objects.all()),
+            id=author_id
+        )
         if request.method == 'POST':
             serializer = users_serializers.SubscriptionSerializer(
                 author,
@@ -45,13 +63,34 @@ class CustomUserViewSet(UserViewSet):
         subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='subscribe/bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def subscribe_bulk(self, request):
+        serializer = bulk_serializers.BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST' and request.user.id in ids:
+            raise ValidationError({
+                'ids': 'Ошибка! Вы не можете подписаться на себя'
+            })
+        results = change_relations(
+            Subscription, request.user, ids, add=request.method == 'POST'
+        )
+        return Response({'results': results})
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        queryset = self.with_recipes_preview(
+            User.objects.filter(subscribing__user=user)
+        )
         pages = self.paginate_queryset(queryset)
         serializer = users_serializers.SubscriptionSerializer(
             pages,
@@ -1,7 +1,6 @@
 from django.contrib import admin
-
 from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
-                            Tag, UsersRecipes)
+                            Tag, UnitConversion, UsersRecipes)
 
 
 class IngredientInline(admin.TabularInline):
@@ -12,6 +11,7 @@ class IngredientInline(admin.TabularInline):
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit',)
     list_filter = ('name',)
+    search_fields = ('name',)
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -29,10 +29,6 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('author', 'name', 'tags',)
     inlines = (IngredientInline,)
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-    favorites_count.short_description = 'Добавлений в избранное'
-
     def get_ingredients(self, obj):
         return ', '.join([
             ingredients.name for ingredients
@@ -43,13 +39,36 @@ class RecipeAdmin(admin.ModelAdmin):
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount',)
 
+    def refresh_recipes(self, recipe_ids):
+        # Ingredient rows send no signals, saving the recipe refreshes its
+        # cached representation, search terms and shopping lists.
+        for recipe in Recipe.objects.filter(pk__in=recipe_ids):
+            recipe.save(update_fields=('updated_at',))
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.refresh_recipes([obj.recipe_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.refresh_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.refresh_recipes(recipe_ids)
+
 
 class FavoritesAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe', 'id')
 
 
 class UserRecipesAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe', 'id')
+    list_display = ('user', 'recipe', 'servings', 'id')
+
+
+class UnitConversionAdmin(admin.ModelAdmin):
+    list_display = ('unit', 'factor', 'base_unit',)
 
 
 admin.site.register(Ingredient, IngredientAdmin)
@@ -58,3 +77,4 @@ admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Favorites, FavoritesAdmin)
 admin.site.register(UsersRecipes, UserRecipesAdmin)
+admin.site.register(UnitConversion, UnitConversionAdmin)
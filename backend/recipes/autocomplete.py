@@ -0,0 +1,52 @@
+import bisect
+
+from recipes.memory_index import MemoryIndex
+from recipes.models import Ingredient
+
+
+class IngredientIndex(MemoryIndex):
+    contains_min_length = 3
+
+    def __init__(self):
+        super().__init__()
+        self._index = ([], [], None)
+
+    def _build(self):
+        ingredients = sorted(
+            Ingredient.objects.only(
+                'id', 'name', 'measurement_unit', 'updated_at'
+            ),
+            key=lambda ingredient: (ingredient.name.casefold(), ingredient.id)
+        )
+        keys = [ingredient.name.casefold() for ingredient in ingredients]
+        last_modified = max(
+            (ingredient.updated_at for ingredient in ingredients),
+            default=None
+        )
+        version = f'{len(ingredients)}:{last_modified}'
+        self._index = (keys, ingredients, version)
+
+    def snapshot(self):
+        self._ensure_built()
+        return self._index
+
+    def version(self):
+        _, _, version = self.snapshot()
+        return version
+
+    def search(self, query, contains=False):
+        keys, ingredients, _ = self.snapshot()
+        query = query.casefold()
+        start = bisect.bisect_left(keys, query)
+        end = bisect.bisect_right(keys, query + chr(0x10FFFF), lo=start)
+        if not contains or len(query) < self.contains_min_length:
+            return ingredients[start:end]
+        contained = [
+            ingredient
+            for key, ingredient in zip(keys, ingredients)
+            if query in key and not key.startswith(query)
+        ]
+        return ingredients[start:end] + contained
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from recipes.models import Favorites, Recipe, UsersRecipes
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def adjust_counter(queryset, field, delta):
+    queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def count_by(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+@transaction.atomic
+def recount_counters():
+    Recipe.objects.update(
+        favorites_count=count_by(Favorites.objects.all(), 'recipe'),
+        cart_count=count_by(UsersRecipes.objects.all(), 'recipe'),
+    )
+    User.objects.update(
+        recipes_count=count_by(Recipe.objects.all(), 'author'),
+        followers_count=count_by(Subscription.objects.all(), 'author'),
+    )
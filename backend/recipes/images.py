@@ -0,0 +1,68 @@
+import hashlib
+import io
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+THUMBNAIL_SIZES = {
+    'card': (600, 600),
+    'preview': (200, 200),
+    'detail': (1200, 1200),
+}
+THUMBNAIL_FORMAT, THUMBNAIL_EXTENSION = (
+    ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+)
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_VERSION_LENGTH = 12
+
+
+def thumbnail_name(name, size, version):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory, 'thumbnails', size,
+        f'{stem}.{version}.{THUMBNAIL_EXTENSION}'
+    )
+
+
+def has_thumbnails(image, version):
+    return bool(version) and all(
+        image.storage.exists(thumbnail_name(image.name, size, version))
+        for size in THUMBNAIL_SIZES
+    )
+
+
+def delete_thumbnails(storage, name, version):
+    if not version:
+        return
+    for size in THUMBNAIL_SIZES:
+        storage.delete(thumbnail_name(name, size, version))
+
+
+def generate_thumbnails(image):
+    # The version is a hash of the thumbnails, so their names change with
+    # the content and they can be cached by clients for as long as needed.
+    storage = image.storage
+    with storage.open(image.name, 'rb') as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    if THUMBNAIL_FORMAT == 'JPEG':
+        original = original.convert('RGB')
+    thumbnails = {}
+    digest = hashlib.sha256()
+    for size, dimensions in THUMBNAIL_SIZES.items():
+        thumbnail = original.copy()
+        thumbnail.thumbnail(dimensions, Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+        thumbnails[size] = buffer.getvalue()
+        digest.update(thumbnails[size])
+    version = digest.hexdigest()[:THUMBNAIL_VERSION_LENGTH]
+    for size, content in thumbnails.items():
+        name = thumbnail_name(image.name, size, version)
+        if not storage.exists(name):
+            storage.save(name, ContentFile(content))
+    return version
@@ -0,0 +1,25 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+
+
+class PostgreSQLOnlyIndexMixin:
+    # GIN, operator classes and INCLUDE columns only exist on PostgreSQL.
+    # SQLite, used for development and tests, gets no index at all.
+
+    def create_sql(self, model, schema_editor, *args, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return ''
+        return super().create_sql(model, schema_editor, *args, **kwargs)
+
+    def remove_sql(self, model, schema_editor, *args, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return ''
+        return super().remove_sql(model, schema_editor, *args, **kwargs)
+
+
+class PostgreSQLIndex(PostgreSQLOnlyIndexMixin, models.Index):
+    pass
+
+
+class PostgreSQLGinIndex(PostgreSQLOnlyIndexMixin, GinIndex):
+    pass
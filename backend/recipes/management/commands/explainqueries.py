@@ -0,0 +1,141 @@
+import re
+from types import SimpleNamespace
+
+from api.filters import RecipeFilter
+from api.pagination import KeysetPagination
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from recipes.models import (Favorites, Recipe, RecipeIngredient, Tag,
+                            UsersRecipes)
+from recipes.shopping_list import aggregate_shopping_list, stored_shopping_list
+from recipes.tag_map import tag_map
+from recipes.user_sets import USER_SETS, user_sets_query
+from users.models import Subscription
+
+User = get_user_model()
+
+SEQUENTIAL_SCANS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)$', re.MULTILINE),
+}
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def explain(queryset):
+    # QuerySet.explain() breaks on window filters such as limit_per_author
+    # on SQLite, so the plan is requested for the compiled query directly.
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        prefix = connection.ops.explain_query_prefix()
+        cursor.execute(f'{prefix} {sql}', params)
+        return '\n'.join(
+            ' '.join(str(column) for column in row)
+            for row in cursor.fetchall()
+        )
+
+
+def sequential_scans(queryset):
+    plan = explain(queryset)
+    table_names = connection.introspection.table_names()
+    # SQLite also reports scans of subqueries such as the one
+    # limit_per_author wraps the window in; only tables matter.
+    tables = [
+        scanned
+        for scanned in SEQUENTIAL_SCANS[connection.vendor].findall(plan)
+        if scanned in table_names
+    ]
+    if (connection.vendor == 'sqlite' and queryset.query.is_sliced
+            and SQLITE_SORT not in plan):
+        # Without a sort step SQLite walks the rowid table in ORDER BY order
+        # and stops at the LIMIT, like an index scan, but plans it as a
+        # plain SCAN.
+        table = queryset.model._meta.db_table
+        tables = [scanned for scanned in tables if scanned != table]
+    return tables
+
+
+def first_pk(model):
+    return model.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+def recipe_feed(user, params):
+    request = SimpleNamespace(user=user)
+    return RecipeFilter(
+        QueryDict(params), queryset=Recipe.objects.for_read(), request=request
+    ).qs[:KeysetPagination.page_size]
+
+
+def canonical_queries():
+    # The querysets the viewsets and serializers run, built from the same
+    # filters and helpers.
+    user = User.objects.order_by('pk').first() or User(pk=1)
+    recipe_ids = [first_pk(Recipe) or 1]
+    slugs = '&'.join(
+        f'tags={slug}' for slug in list(tag_map.snapshot())[:2]
+    ) or 'tags=breakfast'
+    return {
+        'recipe feed': recipe_feed(user, ''),
+        'recipe feed by tags': recipe_feed(user, slugs),
+        'popular recipes': recipe_feed(user, 'ordering=popular'),
+        'trending recipes': recipe_feed(user, 'ordering=trending'),
+        'quick recipes': recipe_feed(user, 'ordering=cooking_time'),
+        'favorited recipes': recipe_feed(user, 'is_favorited=1'),
+        'recipes in cart': recipe_feed(user, 'is_in_shopping_cart=1'),
+        'author recipes': recipe_feed(user, f'author={user.pk}'),
+        'recipe search': recipe_feed(user, 'search=сахар'),
+        'recipe ingredients': RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids
+        ).select_related('ingredient'),
+        'recipe tags': Tag.objects.filter(recipes__in=recipe_ids),
+        'favorite': Favorites.objects.filter(
+            user=user, recipe_id=recipe_ids[0]
+        ),
+        'shopping cart': UsersRecipes.objects.filter(
+            user=user, recipe_id=recipe_ids[0]
+        ),
+        'subscription': Subscription.objects.filter(
+            user=user, author_id=user.pk
+        ),
+        'user sets': user_sets_query(user, list(USER_SETS)),
+        'subscriptions': User.objects.filter(subscribing__user=user),
+        'subscription recipes': Recipe.objects.filter(
+            author__in=[user.pk]
+        ).limit_per_author(3),
+        'shopping list': stored_shopping_list(user),
+        'shopping list aggregate': aggregate_shopping_list(user),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Fails if a hot query is planned with a sequential scan'
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQUENTIAL_SCANS:
+            raise CommandError(
+                f'EXPLAIN output of {connection.vendor} is not supported'
+            )
+        failed = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # The planner prefers sequential scans on small tables, so
+                # they are made prohibitively expensive: one is still chosen
+                # only when no index can serve the query.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in canonical_queries().items():
+                tables = sequential_scans(queryset)
+                if tables:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(
+                        f'{name}: sequential scan on {", ".join(tables)}'
+                    ))
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f'{name}: OK')
+        if failed:
+            raise CommandError(
+                f'Sequential scans in {len(failed)} queries: '
+                f'{", ".join(failed)}'
+            )
+        self.stdout.write(self.style.SUCCESS('All queries use indexes'))
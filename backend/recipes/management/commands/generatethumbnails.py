@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from recipes.images import (delete_thumbnails, generate_thumbnails,
+                            has_thumbnails)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generates missing thumbnails for recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate thumbnails that already exist',
+        )
+
+    def handle(self, *args, **options):
+        generated = 0
+        recipes = Recipe.objects.exclude(image='').only(
+            'id', 'image', 'thumbnail_version'
+        )
+        for recipe in recipes.iterator():
+            image = recipe.image
+            if not image.storage.exists(image.name):
+                self.stderr.write(f'Image {image.name} of recipe {recipe.id} '
+                                  f'is missing')
+                continue
+            if not options['force'] and has_thumbnails(
+                image, recipe.thumbnail_version
+            ):
+                continue
+            try:
+                version = generate_thumbnails(image)
+            except OSError as error:
+                self.stderr.write(f'Image {image.name} of recipe {recipe.id} '
+                                  f'cannot be read: {error}')
+                continue
+            if version != recipe.thumbnail_version:
+                delete_thumbnails(
+                    image.storage, image.name, recipe.thumbnail_version
+                )
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    thumbnail_version=version
+                )
+            generated += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Thumbnails generated for {generated} recipes'
+        ))
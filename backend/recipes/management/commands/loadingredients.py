@@ -1,29 +1,112 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
+import csv
+import json
+from itertools import islice
+from pathlib import Path
 
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
+DEFAULT_PATH = Path(settings.BASE_DIR) / 'data' / 'ingredients.csv'
+FORMATS = ('csv', 'json')
 
-def loadcsv(file_name: str):
-    return pd.read_csv(f'data/{file_name}.csv')
 
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row
+
+
+def read_json(file):
+    # The bundled file is a single JSON array, which the stdlib parser can
+    # only read whole; it is small, and the rows are still batched below.
+    for item in json.load(file):
+        if isinstance(item, dict):
+            yield [item.get('name'), item.get('measurement_unit')]
+        else:
+            yield [item]
+
+
+def is_valid(row):
+    return len(row) >= 2 and all(
+        isinstance(value, str) and value.strip() for value in row[:2]
+    )
+
+
+def unique_rows(rows):
+    seen = set()
+    for name, measurement_unit in rows:
+        key = (name.strip(), measurement_unit.strip())
+        if key not in seen:
+            seen.add(key)
+            yield key
 
-def import_ingredients():
-    data = [
-        Ingredient(
-            name=row[0],
-            measurement_unit=row[1],
-        )
-        for _, row in loadcsv("ingredients").iterrows()
-    ]
-    Ingredient.objects.bulk_create(data)
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def import_batch(batch):
+    # Existing rows are left untouched, so a re-run changes neither their
+    # updated_at nor the ETags built from it.
+    Ingredient.objects.bulk_create(
+        [
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in batch
+        ],
+        ignore_conflicts=True,
+    )
 
 
 class Command(BaseCommand):
-    help = 'Loads ingredients from a CSV file'
+    help = 'Loads ingredients from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format, by default taken from the file extension'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def valid_rows(self, rows):
+        for number, row in enumerate(rows, 1):
+            if is_valid(row):
+                yield row[0], row[1]
+            else:
+                self.skipped += 1
+                self.stderr.write(f'Skipped malformed row {number}: {row}')
 
     def handle(self, *args, **options):
-        import_ingredients()
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Unknown format "{file_format}", use --format'
+            )
+        reader = read_csv if file_format == 'csv' else read_json
+        self.skipped = rows = 0
+        try:
+            file = open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(
+                f'Cannot read {path}: {error.strerror}'
+            ) from error
+        with file:
+            with transaction.atomic():
+                count = Ingredient.objects.count()
+                for batch in batches(
+                    unique_rows(self.valid_rows(reader(file))),
+                    options['batch_size']
+                ):
+                    import_batch(batch)
+                    rows += len(batch)
+                inserted = Ingredient.objects.count() - count
         self.stdout.write(self.style.SUCCESS(
-            'Ingredients imported successfully'
+            f'Ingredients imported successfully: {inserted} inserted, '
+            f'{rows - inserted} already present, {self.skipped} skipped'
         ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(recipe_ids), batch_size):
+            update_search_index(recipe_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f'Search index rebuilt for {len(recipe_ids)} recipes'
+        ))
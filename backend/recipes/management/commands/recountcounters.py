@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from recipes.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes denormalized recipe and user counters'
+
+    def handle(self, *args, **options):
+        recount_counters()
+        self.stdout.write(self.style.SUCCESS(
+            'Counters recomputed successfully'
+        ))
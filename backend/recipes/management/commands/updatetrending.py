@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from recipes.trending import update_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Recomputes time-decayed trending scores of recipes'
+
+    def handle(self, *args, **options):
+        updated = update_trending_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f'Trending scores updated for {updated} recipes'
+        ))
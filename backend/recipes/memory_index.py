@@ -0,0 +1,31 @@
+import threading
+import time
+
+
+class MemoryIndex:
+    ttl = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+
+    def invalidate(self):
+        self._built_at = None
+
+    def _is_stale(self):
+        return (
+            self._built_at is None
+            or time.monotonic() - self._built_at > self.ttl
+        )
+
+    def _build(self):
+        raise NotImplementedError('MemoryIndex._build() must be implemented.')
+
+    def _ensure_built(self):
+        # Signals only reach the current process, so other workers rely on
+        # the ttl to pick up changes.
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._build()
+                    self._built_at = time.monotonic()
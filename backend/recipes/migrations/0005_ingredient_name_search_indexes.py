@@ -0,0 +1,25 @@
+from django.contrib.postgres.indexes import OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+from django.db.models.functions import Upper
+
+import recipes.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipeingredient_recipe_ingredient'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=recipes.indexes.PostgreSQLIndex(OpClass(Upper('name'), name='text_pattern_ops'), name='ingredient_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=recipes.indexes.PostgreSQLGinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='ingredient_name_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.2 on 2026-10-18 18:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='favorites',
+            options={'ordering': ['-id'], 'verbose_name': 'Избранное', 'verbose_name_plural': 'Избранное'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ['-id'], 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipeingredient',
+            options={'ordering': ['-id'], 'verbose_name': 'Состав блюда', 'verbose_name_plural': 'Состав блюд'},
+        ),
+        migrations.AlterModelOptions(
+            name='usersrecipes',
+            options={'ordering': ['-id'], 'verbose_name': 'Корзина покупок', 'verbose_name_plural': 'Корзины покупок'},
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата публикации'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+    ]
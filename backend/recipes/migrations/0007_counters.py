@@ -0,0 +1,51 @@
+# Generated by Django 4.2.2 on 2026-10-18 18:52
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_by(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorites = apps.get_model('recipes', 'Favorites')
+    UsersRecipes = apps.get_model('recipes', 'UsersRecipes')
+    User = apps.get_model('users', 'User')
+    Subscription = apps.get_model('users', 'Subscription')
+    Recipe.objects.update(
+        favorites_count=count_by(Favorites.objects.all(), 'recipe'),
+        cart_count=count_by(UsersRecipes.objects.all(), 'recipe'),
+    )
+    User.objects.update(
+        recipes_count=count_by(Recipe.objects.all(), 'author'),
+        followers_count=count_by(Subscription.objects.all(), 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_timestamps'),
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
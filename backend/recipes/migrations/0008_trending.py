@@ -0,0 +1,48 @@
+# Generated by Django 4.2.2 on 2026-10-18 18:53
+
+import datetime
+
+from django.db import migrations, models
+
+# Rows that existed before the column have no known date. They are dated
+# to the epoch so that the trending score does not count them as new.
+UNKNOWN_CREATED_AT = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorites',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=UNKNOWN_CREATED_AT, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность за последнее время'),
+        ),
+        migrations.AddField(
+            model_name='usersrecipes',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=UNKNOWN_CREATED_AT, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-id'], name='recipe_cooking_time_idx'),
+        ),
+    ]
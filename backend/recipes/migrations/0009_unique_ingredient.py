@@ -0,0 +1,51 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:05
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'), count=Count('id')
+    ).filter(count__gt=1).order_by()
+    for duplicate in duplicates:
+        keep_id = duplicate['keep_id']
+        extra_ids = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=keep_id).values_list('id', flat=True))
+        for item in RecipeIngredient.objects.filter(
+            ingredient_id__in=extra_ids
+        ):
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=item.recipe_id, ingredient_id=keep_id
+            ).first()
+            if kept is None:
+                item.ingredient_id = keep_id
+                item.save(update_fields=['ingredient'])
+            else:
+                kept.amount += item.amount
+                kept.save(update_fields=['amount'])
+                item.delete()
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_trending'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
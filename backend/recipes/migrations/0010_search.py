@@ -0,0 +1,61 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:08
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+import recipes.indexes
+
+BACKFILL_SEARCH_VECTOR = (
+    "UPDATE recipes_recipe SET search_vector = "
+    "setweight(to_tsvector('russian', name), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(("
+    "SELECT string_agg(ingredient.name, ' ') "
+    "FROM recipes_recipeingredient item "
+    "JOIN recipes_ingredient ingredient ON ingredient.id = item.ingredient_id "
+    "WHERE item.recipe_id = recipes_recipe.id), '')), 'B') || "
+    "setweight(to_tsvector('russian', text), 'C')"
+)
+
+
+def backfill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(BACKFILL_SEARCH_VECTOR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый индекс'),
+        ),
+        migrations.CreateModel(
+            name='RecipeSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, verbose_name='Слово')),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Вес')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Поисковое слово',
+                'verbose_name_plural': 'Поисковые слова',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipesearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'recipe'), name='unique_recipe_search_term'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=recipes.indexes.PostgreSQLGinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(
+            backfill_search_vector, migrations.RunPython.noop
+        ),
+    ]
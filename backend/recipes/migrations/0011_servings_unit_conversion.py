@@ -0,0 +1,49 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:12
+
+import django.core.validators
+from django.db import migrations, models
+
+UNIT_CONVERSIONS = (
+    ('кг', 'г', 1000),
+    ('л', 'мл', 1000),
+    ('ст. л.', 'ч. л.', 3),
+)
+
+
+def create_unit_conversions(apps, schema_editor):
+    UnitConversion = apps.get_model('recipes', 'UnitConversion')
+    UnitConversion.objects.bulk_create(
+        UnitConversion(unit=unit, base_unit=base_unit, factor=factor)
+        for unit, base_unit, factor in UNIT_CONVERSIONS
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(max_length=200, unique=True, verbose_name='Единица измерения')),
+                ('base_unit', models.CharField(max_length=200, verbose_name='Базовая единица измерения')),
+                ('factor', models.PositiveIntegerField(verbose_name='Количество базовых единиц')),
+            ],
+            options={
+                'verbose_name': 'Перевод единиц измерения',
+                'verbose_name_plural': 'Переводы единиц измерения',
+            },
+        ),
+        migrations.AddField(
+            model_name='usersrecipes',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Количество порций'),
+        ),
+        migrations.RunPython(
+            create_unit_conversions, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:19
+
+from django.db import migrations, models
+import recipes.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_shopping_list'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['recipe', '-id'], name='recipe_ingredient_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersrecipes',
+            index=recipes.indexes.PostgreSQLIndex(fields=['user', 'recipe'], include=['servings'], name='cart_user_servings_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistitem',
+            index=recipes.indexes.PostgreSQLIndex(fields=['user', 'name', 'measurement_unit'], include=['amount'], name='shopping_list_amount_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:34
+
+from django.db import migrations, models
+import recipes.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_hot_lookup_indexes'),
+        ('users', '0005_shopping_list_version'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='shoppinglistitem',
+            name='unique_shopping_list_item',
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версия списка'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'version', 'name', 'measurement_unit'), name='unique_shopping_list_item'),
+        ),
+        migrations.RemoveIndex(
+            model_name='shoppinglistitem',
+            name='shopping_list_amount_idx',
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistitem',
+            index=recipes.indexes.PostgreSQLIndex(fields=['user', 'version', 'name', 'measurement_unit'], include=['amount'], name='shopping_list_amount_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_shopping_list_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail_version',
+            field=models.CharField(blank=True, editable=False, max_length=16, verbose_name='Версия миниатюр'),
+        ),
+    ]
@@ -1,6 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint, Window
+from django.db.models.functions import RowNumber, Upper
+from django.utils import timezone
+from recipes.indexes import PostgreSQLGinIndex, PostgreSQLIndex
 
 User = get_user_model()
 
@@ -14,10 +20,31 @@ class Ingredient(models.Model):
         verbose_name='Единица измерения',
         max_length=200
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        indexes = [
+            PostgreSQLIndex(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='ingredient_name_prefix_idx'
+            ),
+            PostgreSQLGinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='ingredient_name_trgm_idx'
+            ),
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -39,6 +66,11 @@ class Tag(models.Model):
         unique=True,
         max_length=200
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -48,6 +80,56 @@ class Tag(models.Model):
         return self.name
 
 
+class UnitConversion(models.Model):
+    unit = models.CharField(
+        verbose_name='Единица измерения',
+        max_length=200,
+        unique=True
+    )
+    base_unit = models.CharField(
+        verbose_name='Базовая единица измерения',
+        max_length=200
+    )
+    factor = models.PositiveIntegerField(
+        verbose_name='Количество базовых единиц'
+    )
+
+    class Meta:
+        verbose_name = 'Перевод единиц измерения'
+        verbose_name_plural = 'Переводы единиц измерения'
+
+    def __str__(self):
+        return f'1 {self.unit} = {self.factor} {self.base_unit}'
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def touch(self):
+        return self.update(updated_at=timezone.now())
+
+    def limit_per_author(self, limit):
+        return self.annotate(
+            author_row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=F('id').desc(),
+            )
+        ).filter(author_row_number__lte=limit)
+
+    def for_read(self):
+        return self.select_related('author')
+
+
+def content_prefetches():
+    return (
+        'tags',
+        models.Prefetch(
+            'ingredient_in_recipe',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ),
+    )
+
+
 class Recipe(models.Model):
     name = models.CharField(
         verbose_name='Название',
@@ -79,16 +161,103 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Теги'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+    trending_score = models.FloatField(
+        verbose_name='Популярность за последнее время',
+        default=0,
+        editable=False
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый индекс',
+        null=True,
+        editable=False
+    )
+    thumbnail_version = models.CharField(
+        verbose_name='Версия миниатюр',
+        max_length=16,
+        blank=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_popular_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-id'],
+                name='recipe_cooking_time_idx'
+            ),
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_idx'
+            ),
+            PostgreSQLGinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeSearchTerm(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='search_terms',
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE
+    )
+    term = models.CharField(
+        verbose_name='Слово',
+        max_length=100
+    )
+    weight = models.PositiveSmallIntegerField(
+        verbose_name='Вес'
+    )
+
+    class Meta:
+        verbose_name = 'Поисковое слово'
+        verbose_name_plural = 'Поисковые слова'
+        constraints = [
+            UniqueConstraint(
+                fields=['term', 'recipe'],
+                name='unique_recipe_search_term'
+            )
+        ]
+
+    def __str__(self):
+        return self.term
+
+
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
         Recipe,
@@ -110,6 +279,12 @@ class RecipeIngredient(models.Model):
         ordering = ['-id']
         verbose_name = 'Состав блюда'
         verbose_name_plural = 'Состав блюд'
+        indexes = [
+            models.Index(
+                fields=['recipe', '-id'],
+                name='recipe_ingredient_recipe_idx'
+            ),
+        ]
         constraints = [
             UniqueConstraint(
                 fields=['recipe', 'ingredient'],
@@ -136,6 +311,11 @@ class Favorites(models.Model):
         verbose_name='Рецепт',
         on_delete=models.CASCADE
     )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ['-id']
@@ -165,11 +345,28 @@ class UsersRecipes(models.Model):
         verbose_name='Рецепт',
         on_delete=models.CASCADE
     )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Количество порций',
+        default=1,
+        validators=[MinValueValidator(1)]
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'Корзина покупок'
         verbose_name_plural = 'Корзины покупок'
+        indexes = [
+            PostgreSQLIndex(
+                fields=['user', 'recipe'],
+                include=['servings'],
+                name='cart_user_servings_idx'
+            ),
+        ]
         constraints = [
             UniqueConstraint(
                 fields=['user', 'recipe'],
@@ -179,3 +376,48 @@ class UsersRecipes(models.Model):
 
     def __str__(self):
         return f'{self.recipe} добавлен в список покупок.'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE
+    )
+    name = models.CharField(
+        verbose_name='Название ингредиента',
+        max_length=200
+    )
+    measurement_unit = models.CharField(
+        verbose_name='Единица измерения',
+        max_length=200
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия списка',
+        default=0
+    )
+
+    class Meta:
+        ordering = ['name', 'measurement_unit']
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        indexes = [
+            PostgreSQLIndex(
+                fields=['user', 'version', 'name', 'measurement_unit'],
+                include=['amount'],
+                name='shopping_list_amount_idx'
+            ),
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'version', 'name', 'measurement_unit'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.measurement_unit}) - {self.amount}'
@@ -0,0 +1,73 @@
+import heapq
+from collections import Counter, defaultdict
+
+from recipes.memory_index import MemoryIndex
+from recipes.models import RecipeIngredient
+
+
+class PantryIndex(MemoryIndex):
+
+    def __init__(self):
+        super().__init__()
+        self._recipes = {}
+        self._postings = defaultdict(set)
+
+    def _build(self):
+        recipes = defaultdict(set)
+        postings = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            recipes[recipe_id].add(ingredient_id)
+            postings[ingredient_id].add(recipe_id)
+        self._recipes = dict(recipes)
+        self._postings = postings
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            self._postings[ingredient_id].discard(recipe_id)
+
+    def update_recipe(self, recipe_id):
+        if self._built_at is None:
+            return
+        ingredient_ids = set(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', flat=True))
+        with self._lock:
+            self._remove(recipe_id)
+            if ingredient_ids:
+                self._recipes[recipe_id] = ingredient_ids
+                for ingredient_id in ingredient_ids:
+                    self._postings[ingredient_id].add(recipe_id)
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def search(self, ingredient_ids, limit):
+        self._ensure_built()
+        matched = Counter()
+        with self._lock:
+            for ingredient_id in set(ingredient_ids):
+                matched.update(self._postings.get(ingredient_id, ()))
+            required = {
+                recipe_id: len(self._recipes[recipe_id])
+                for recipe_id in matched
+            }
+        best = heapq.nsmallest(
+            limit,
+            matched,
+            key=lambda recipe_id: (
+                -matched[recipe_id],
+                required[recipe_id] - matched[recipe_id],
+                -recipe_id,
+            )
+        )
+        return [
+            (recipe_id, matched[recipe_id],
+             required[recipe_id] - matched[recipe_id])
+            for recipe_id in best
+        ]
+
+
+pantry_index = PantryIndex()
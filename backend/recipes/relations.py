@@ -0,0 +1,126 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from recipes.counters import adjust_counter
+from recipes.models import Favorites, UsersRecipes
+from recipes.shopping_list import invalidate_shopping_lists
+from recipes.user_sets import invalidate_user_sets
+from users.models import Subscription
+
+RELATIONS = {
+    Favorites: ('recipe', 'favorites_count'),
+    UsersRecipes: ('recipe', 'cart_count'),
+    Subscription: ('author', 'followers_count'),
+}
+
+
+def quoted_names(model):
+    quote = connection.ops.quote_name
+    target_field = model._meta.get_field(RELATIONS[model][0])
+    target_meta = target_field.related_model._meta
+    return {
+        'table': quote(model._meta.db_table),
+        'user': quote(model._meta.get_field('user').column),
+        'target': quote(target_field.column),
+        'target_table': quote(target_meta.db_table),
+        'target_pk': quote(target_meta.pk.column),
+    }
+
+
+def relation_changed(model, user, target_ids, delta):
+    # Raw statements bypass the model signals, so the counter and the cached
+    # id sets are updated here, once for the whole batch. The sets version is
+    # bumped after commit, so a set loaded before it is never served.
+    target, counter = RELATIONS[model]
+    target_model = model._meta.get_field(target).related_model
+    adjust_counter(
+        target_model.objects.filter(pk__in=target_ids), counter, delta
+    )
+    transaction.on_commit(lambda: invalidate_user_sets(user.pk))
+    if model is UsersRecipes:
+        invalidate_shopping_lists([user.pk])
+
+
+def column_values(model, fields):
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.name in ('user', RELATIONS[model][0]):
+            continue
+        if getattr(field, 'auto_now_add', False):
+            value = timezone.now()
+        else:
+            value = fields.get(field.name, field.get_default())
+        values[field.column] = field.get_db_prep_save(value, connection)
+    return values
+
+
+@transaction.atomic
+def add_relations(model, user, target_ids, **fields):
+    names = quoted_names(model)
+    columns = [names['user'], names['target']]
+    values = ['%s', names['target_pk']]
+    params = [user.pk]
+    for column, value in column_values(model, fields).items():
+        columns.append(connection.ops.quote_name(column))
+        values.append('%s')
+        params.append(value)
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} ({columns}) '
+            'SELECT {values} FROM {target_table} '
+            'WHERE {target_pk} IN ({placeholders}) '
+            'ON CONFLICT DO NOTHING RETURNING {target}'.format(
+                columns=', '.join(columns),
+                values=', '.join(values),
+                placeholders=placeholders,
+                **names
+            ),
+            [*params, *target_ids]
+        )
+        added = [row[0] for row in cursor.fetchall()]
+    if added:
+        relation_changed(model, user, added, 1)
+    return added
+
+
+@transaction.atomic
+def remove_relations(model, user, target_ids):
+    names = quoted_names(model)
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {table} '
+            'WHERE {user} = %s AND {target} IN ({placeholders}) '
+            'RETURNING {target}'.format(placeholders=placeholders, **names),
+            [user.pk, *target_ids]
+        )
+        removed = [row[0] for row in cursor.fetchall()]
+    if removed:
+        relation_changed(model, user, removed, -1)
+    return removed
+
+
+def change_relations(model, user, target_ids, add):
+    target_model = model._meta.get_field(RELATIONS[model][0]).related_model
+    existing = set(
+        target_model.objects.filter(pk__in=target_ids).values_list(
+            'pk', flat=True
+        )
+    )
+    if add:
+        changed = set(add_relations(model, user, target_ids))
+    else:
+        changed = set(remove_relations(model, user, target_ids))
+    unchanged = 'exists' if add else 'absent'
+    changed_status = 'added' if add else 'removed'
+    return [
+        {
+            'id': target_id,
+            'status': (
+                'not_found' if target_id not in existing
+                else changed_status if target_id in changed
+                else unchanged
+            ),
+        }
+        for target_id in target_ids
+    ]
@@ -0,0 +1,106 @@
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import (Exists, F, OuterRef, Q, Subquery, Sum, TextField,
+                              Value)
+from django.db.models.functions import Coalesce
+from recipes.models import Recipe, RecipeIngredient, RecipeSearchTerm
+
+SEARCH_CONFIG = 'russian'
+# Weights of the name, ingredient names and text, as in setweight A/B/C.
+TERM_WEIGHTS = {'name': 4, 'ingredients': 2, 'text': 1}
+TERM_MAX_LENGTH = 100
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    return {
+        term[:TERM_MAX_LENGTH]
+        for term in re.findall(r'\w+', text.casefold())
+        if len(term) > 1
+    }
+
+
+def ingredient_names():
+    return Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef('pk')).order_by(
+        ).values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+
+
+def update_search_index(recipe_ids):
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    if uses_search_vector():
+        recipes.update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(
+                Coalesce(
+                    ingredient_names(), Value(''), output_field=TextField()
+                ),
+                weight='B',
+                config=SEARCH_CONFIG
+            )
+            + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+        ))
+        return
+    names = {}
+    for recipe_id, name in RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient__name'):
+        names.setdefault(recipe_id, []).append(name)
+    terms = []
+    for recipe_id, name, text in recipes.values_list('id', 'name', 'text'):
+        weights = {}
+        for field, value in (
+            ('name', name),
+            ('ingredients', ' '.join(names.get(recipe_id, ()))),
+            ('text', text),
+        ):
+            for term in tokenize(value):
+                weights[term] = weights.get(term, 0) + TERM_WEIGHTS[field]
+        terms.extend(
+            RecipeSearchTerm(recipe_id=recipe_id, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    RecipeSearchTerm.objects.filter(recipe_id__in=recipe_ids).delete()
+    RecipeSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def prefix(term):
+    # A range instead of LIKE, so the (term, recipe) index is used.
+    return Q(term__gte=term, term__lt=term + chr(0x10FFFF))
+
+
+def search(queryset, text):
+    if uses_search_vector():
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-id')
+    terms = tokenize(text)
+    if not terms:
+        return queryset.none()
+    for term in terms:
+        queryset = queryset.filter(Exists(RecipeSearchTerm.objects.filter(
+            prefix(term), recipe=OuterRef('pk')
+        )))
+    matched = Q()
+    for term in terms:
+        matched |= prefix(term)
+    return queryset.annotate(search_rank=Subquery(
+        RecipeSearchTerm.objects.filter(
+            matched, recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            rank=Sum('weight')
+        ).values('rank')
+    )).order_by('-search_rank', '-id')
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from recipes.models import (RecipeIngredient, ShoppingListItem, UnitConversion,
+                            UsersRecipes)
+
+User = get_user_model()
+
+SHOPPING_LIST_FIELDS = ('name', 'measurement_unit', 'amount')
+
+
+def conversion(field):
+    return Subquery(
+        UnitConversion.objects.filter(
+            unit=OuterRef('ingredient__measurement_unit')
+        ).values(field)[:1]
+    )
+
+
+def aggregate_shopping_list(user):
+    # Amounts are converted to the base unit and multiplied by the number of
+    # servings inside the grouped query, so "г" and "кг" end up in one row.
+    return RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values(
+        name=F('ingredient__name'),
+        measurement_unit=Coalesce(
+            conversion('base_unit'), F('ingredient__measurement_unit')
+        ),
+    ).annotate(
+        amount=Sum(
+            F('amount')
+            * Coalesce(conversion('factor'), Value(1))
+            * F('recipe__shopping_cart__servings'),
+            output_field=IntegerField()
+        )
+    ).order_by('name', 'measurement_unit')
+
+
+@transaction.atomic
+def build_shopping_list(user):
+    # The version is read before the cart: if the cart changes meanwhile, the
+    # version is bumped after that commit and these rows are never read.
+    version = User.objects.filter(pk=user.pk).values_list(
+        'shopping_list_version', flat=True
+    ).get()
+    ShoppingListItem.objects.filter(user=user, version__lt=version).delete()
+    # The aggregate is inserted with a single INSERT ... SELECT, so the list
+    # never passes through Python.
+    query, params = aggregate_shopping_list(user).query.sql_with_params()
+    quote = connection.ops.quote_name
+    meta = ShoppingListItem._meta
+    fields = ', '.join(
+        quote(meta.get_field(field).column) for field in SHOPPING_LIST_FIELDS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} ({user}, {version}, {fields}) '
+            'SELECT %s, %s, {fields} FROM ({query}) AS items '
+            'WHERE TRUE ON CONFLICT DO NOTHING'.format(
+                table=quote(meta.db_table),
+                user=quote(meta.get_field('user').column),
+                version=quote(meta.get_field('version').column),
+                fields=fields,
+                query=query,
+            ),
+            [user.pk, version, *params]
+        )
+
+
+def stored_shopping_list(user):
+    return ShoppingListItem.objects.filter(
+        user=user, version=F('user__shopping_list_version')
+    ).values(*SHOPPING_LIST_FIELDS)
+
+
+def get_shopping_list(user):
+    # The list is stored per user and only rebuilt after it was invalidated,
+    # so repeated downloads stream the user's rows straight from the
+    # database. An empty cart is detected without a rebuild.
+    items = stored_shopping_list(user)
+    if not items.exists():
+        if not UsersRecipes.objects.filter(user=user).exists():
+            return None
+        build_shopping_list(user)
+    return items.iterator()
+
+
+def invalidate_shopping_lists(users):
+    # Stored rows are never updated in place: bumping the version after
+    # commit hides them, including rows a concurrent rebuild may still write.
+    transaction.on_commit(lambda: User.objects.filter(pk__in=users).update(
+        shopping_list_version=F('shopping_list_version') + 1
+    ))
+
+
+def invalidate_recipe_shopping_lists(recipes):
+    invalidate_shopping_lists(
+        UsersRecipes.objects.filter(recipe__in=recipes).values('user_id')
+    )
@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from recipes.autocomplete import ingredient_index
+from recipes.counters import adjust_counter
+from recipes.images import delete_thumbnails, generate_thumbnails
+from recipes.models import (Favorites, Ingredient, Recipe, Tag, UnitConversion,
+                            UsersRecipes)
+from recipes.pantry import pantry_index
+from recipes.search import update_search_index
+from recipes.shopping_list import (invalidate_recipe_shopping_lists,
+                                   invalidate_shopping_lists)
+from recipes.tag_map import tag_map
+from recipes.user_sets import USER_SETS, invalidate_user_sets
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_map(sender, **kwargs):
+    tag_map.invalidate()
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def refresh_ingredient_recipes(sender, instance, signal, **kwargs):
+    # Ingredient rows send no signals of their own, so a deleted ingredient
+    # is handled here once, with its recipes collected before the cascade.
+    recipe_ids = list(
+        Recipe.objects.filter(ingredients=instance).values_list(
+            'id', flat=True
+        )
+    )
+    if not recipe_ids:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).touch()
+    invalidate_recipe_shopping_lists(recipe_ids)
+    transaction.on_commit(lambda: update_search_index(recipe_ids))
+    if signal is pre_delete:
+        transaction.on_commit(pantry_index.invalidate)
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def touch_tag_recipes(sender, instance, **kwargs):
+    Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(sender, instance, **kwargs):
+    # Ingredients are written after the recipe itself, so the index is
+    # rebuilt once the whole change is committed.
+    transaction.on_commit(lambda: update_search_index([instance.pk]))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_pantry_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: pantry_index.update_recipe(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_pantry_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: pantry_index.remove_recipe(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=UsersRecipes)
+def invalidate_user_shopping_list(sender, instance, **kwargs):
+    invalidate_shopping_lists([instance.user_id])
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe_shopping_lists_on_save(
+    sender, instance, created, **kwargs
+):
+    # Ingredient rows send no signals: they are only written together with
+    # the recipe itself, which refreshes everything derived from them.
+    if not created:
+        invalidate_recipe_shopping_lists([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=UnitConversion)
+def invalidate_all_shopping_lists(sender, **kwargs):
+    invalidate_shopping_lists(UsersRecipes.objects.values('user_id'))
+
+
+@receiver(pre_save, sender=Recipe)
+def find_replaced_image(sender, instance, update_fields=None, **kwargs):
+    # Thumbnails are only generated when the image itself changes, the
+    # previous image is remembered so that its thumbnails can be removed.
+    instance.replaced_image = None
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    stored = Recipe.objects.filter(pk=instance.pk).values_list(
+        'image', 'thumbnail_version'
+    ).first() if instance.pk else None
+    if stored is None or stored[0] != instance.image.name:
+        instance.replaced_image = stored or ('', '')
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_thumbnails(sender, instance, **kwargs):
+    if instance.replaced_image is None:
+        return
+    storage = instance.image.storage
+    name, version = instance.replaced_image
+    instance.replaced_image = None
+    transaction.on_commit(lambda: delete_thumbnails(storage, name, version))
+    try:
+        thumbnail_version = generate_thumbnails(instance.image)
+    except OSError:
+        # The original image is served until generatethumbnails succeeds.
+        thumbnail_version = ''
+    instance.thumbnail_version = thumbnail_version
+    Recipe.objects.filter(pk=instance.pk).update(
+        thumbnail_version=thumbnail_version
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_thumbnails(sender, instance, **kwargs):
+    storage = instance.image.storage
+    name, version = instance.image.name, instance.thumbnail_version
+    transaction.on_commit(lambda: delete_thumbnails(storage, name, version))
+
+
+def counter_receivers(sender, model, field, related):
+    @receiver(post_save, sender=sender, weak=False)
+    def increment(instance, created, **kwargs):
+        related_id = getattr(instance, f'{related}_id')
+        if created and related_id is not None:
+            adjust_counter(model.objects.filter(pk=related_id), field, 1)
+
+    @receiver(post_delete, sender=sender, weak=False)
+    def decrement(instance, **kwargs):
+        related_id = getattr(instance, f'{related}_id')
+        if related_id is not None:
+            adjust_counter(model.objects.filter(pk=related_id), field, -1)
+
+
+counter_receivers(Favorites, Recipe, 'favorites_count', 'recipe')
+counter_receivers(UsersRecipes, Recipe, 'cart_count', 'recipe')
+counter_receivers(Recipe, User, 'recipes_count', 'author')
+counter_receivers(Subscription, User, 'followers_count', 'author')
+
+
+def user_set_receivers(sender):
+    @receiver((post_save, post_delete), sender=sender, weak=False)
+    def invalidate(instance, **kwargs):
+        transaction.on_commit(lambda: invalidate_user_sets(instance.user_id))
+
+
+for model, _ in USER_SETS.values():
+    user_set_receivers(model)
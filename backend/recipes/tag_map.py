@@ -0,0 +1,29 @@
+from recipes.memory_index import MemoryIndex
+from recipes.models import Tag
+
+
+class TagMap(MemoryIndex):
+
+    def __init__(self):
+        super().__init__()
+        self._slugs = {}
+
+    def _build(self):
+        self._slugs = dict(Tag.objects.values_list('slug', 'id'))
+
+    def snapshot(self):
+        self._ensure_built()
+        return self._slugs
+
+    def ids(self, slugs):
+        tags = self.snapshot()
+        missing = [slug for slug in slugs if slug not in tags]
+        # A tag created in another worker is unknown here until the ttl
+        # expires, so unknown slugs are checked in the database first.
+        if missing and Tag.objects.filter(slug__in=missing).exists():
+            self.invalidate()
+            tags = self.snapshot()
+        return [tags[slug] for slug in slugs if slug in tags]
+
+
+tag_map = TagMap()
@@ -0,0 +1,43 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from recipes.models import Favorites, Recipe, UsersRecipes
+
+TRENDING_WINDOW_DAYS = 14
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_WEIGHTS = (
+    (Favorites, 1.0),
+    (UsersRecipes, 0.5),
+)
+
+
+def compute_trending_scores(now=None):
+    now = now or timezone.now()
+    since = now - timezone.timedelta(days=TRENDING_WINDOW_DAYS)
+    scores = defaultdict(float)
+    for model, weight in TRENDING_WEIGHTS:
+        events = model.objects.filter(created_at__gte=since).values_list(
+            'recipe_id', 'created_at'
+        )
+        for recipe_id, created_at in events.iterator():
+            age = (now - created_at).total_seconds() / 3600
+            scores[recipe_id] += weight * 0.5 ** (
+                age / TRENDING_HALF_LIFE_HOURS
+            )
+    return scores
+
+
+@transaction.atomic
+def update_trending_scores(now=None):
+    scores = compute_trending_scores(now)
+    Recipe.objects.filter(trending_score__gt=0).update(trending_score=0)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(id=recipe_id, trending_score=score)
+            for recipe_id, score in scores.items()
+        ],
+        ['trending_score'],
+        batch_size=500,
+    )
+    return len(scores)
@@ -0,0 +1,88 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Value
+from recipes.models import Favorites, UsersRecipes
+from users.models import Subscription
+
+USER_SETS = {
+    'favorites': (Favorites, 'recipe_id'),
+    'shopping_cart': (UsersRecipes, 'recipe_id'),
+    'subscriptions': (Subscription, 'author_id'),
+}
+
+
+def user_sets_version_key(user_id):
+    return f'user:{user_id}:sets_version'
+
+
+def user_sets_version(user_id):
+    key = user_sets_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A lost version starts from the current time, so sets stored under
+        # the old one are never read again.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def user_set_key(user_id, name, version):
+    return f'user:{user_id}:{name}:{version}'
+
+
+def user_sets_query(user, names):
+    queries = [
+        USER_SETS[name][0].objects.filter(user=user).annotate(
+            relation=Value(name, output_field=CharField())
+        ).order_by().values_list('relation', USER_SETS[name][1])
+        for name in names
+    ]
+    return queries[0].union(*queries[1:], all=True)
+
+
+def load_user_sets(user, names):
+    ids = {name: set() for name in names}
+    for name, pk in user_sets_query(user, names):
+        ids[name].add(pk)
+    return {name: frozenset(values) for name, values in ids.items()}
+
+
+def get_user_sets(request, *names):
+    # Sets are memoized on the request, so every serializer in one response
+    # shares a single cache round trip.
+    sets = getattr(request, 'user_sets', None)
+    if sets is None:
+        sets = request.user_sets = {}
+    user = request.user
+    missing = [name for name in names if name not in sets]
+    if user.is_anonymous:
+        sets.update((name, frozenset()) for name in missing)
+    elif missing:
+        # The version is read before the sets are loaded: a change committed
+        # meanwhile bumps it, and sets stored under the old one are ignored.
+        version = user_sets_version(user.pk)
+        keys = {
+            name: user_set_key(user.pk, name, version) for name in missing
+        }
+        cached = cache.get_many(keys.values())
+        sets.update(
+            (name, cached[key]) for name, key in keys.items() if key in cached
+        )
+        not_cached = [name for name in missing if keys[name] not in cached]
+        if not_cached:
+            loaded = load_user_sets(user, not_cached)
+            sets.update(loaded)
+            cache.set_many(
+                {keys[name]: ids for name, ids in loaded.items()},
+                settings.USER_SETS_CACHE_TIMEOUT
+            )
+    return [sets[name] for name in names]
+
+
+def invalidate_user_sets(user_id):
+    try:
+        cache.incr(user_sets_version_key(user_id))
+    except ValueError:
+        pass
@@ -0,0 +1,173 @@
+import base64
+import csv
+import io
+import time
+from contextlib import contextmanager
+
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from PIL import Image
+from recipes.autocomplete import ingredient_index
+from recipes.counters import recount_counters
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                            Tag, UsersRecipes)
+from recipes.pantry import pantry_index
+from recipes.search import update_search_index
+from recipes.tag_map import tag_map
+from rest_framework.test import APIClient
+from users.models import Subscription
+
+User = get_user_model()
+
+USERS_COUNT = 50
+RECIPES_COUNT = 3000
+INGREDIENTS_PER_RECIPE = 8
+FAVORITES_COUNT = 500
+CART_COUNT = 100
+SUBSCRIPTIONS_COUNT = 30
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+def load_ingredients():
+    path = settings.BASE_DIR / 'data' / 'ingredients.csv'
+    with open(path, encoding='utf-8') as file:
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in csv.reader(file)
+        )
+
+
+def seed():
+    load_ingredients()
+    tags = Tag.objects.bulk_create(
+        Tag(name=name, color=color, slug=slug)
+        for name, color, slug in TAGS
+    )
+    password = make_password('password')
+    users = User.objects.bulk_create(
+        User(
+            email=f'user{number}@foodgram.ru',
+            username=f'user{number}',
+            first_name=f'Имя{number}',
+            last_name=f'Фамилия{number}',
+            password=password,
+        )
+        for number in range(USERS_COUNT)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            name=f'Рецепт {number}',
+            author=users[number % USERS_COUNT],
+            text='Описание рецепта ' * 20,
+            image='recipes/seed.png',
+            cooking_time=number % 120 + 1,
+        )
+        for number in range(RECIPES_COUNT)
+    )
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient_id=ingredient_ids[
+                (number * 7 + offset * 31) % len(ingredient_ids)
+            ],
+            amount=offset * 10 + 5,
+        )
+        for number, recipe in enumerate(recipes)
+        for offset in range(INGREDIENTS_PER_RECIPE)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for number, recipe in enumerate(recipes)
+        for tag in (tags[number % 3], tags[(number + 1) % 3])
+    )
+    reader = users[0]
+    Favorites.objects.bulk_create(
+        Favorites(user=reader, recipe=recipe)
+        for recipe in recipes[:FAVORITES_COUNT]
+    )
+    UsersRecipes.objects.bulk_create(
+        UsersRecipes(user=reader, recipe=recipe)
+        for recipe in recipes[::RECIPES_COUNT // CART_COUNT]
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=reader, author=author)
+        for author in users[1:SUBSCRIPTIONS_COUNT + 1]
+    )
+    recount_counters()
+    update_search_index([recipe.id for recipe in recipes])
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_ingredient_index():
+    ingredient_index.invalidate()
+    pantry_index.invalidate()
+    tag_map.invalidate()
+    yield
+    ingredient_index.invalidate()
+    pantry_index.invalidate()
+    tag_map.invalidate()
+
+
+@pytest.fixture
+def reader(db):
+    return User.objects.get(username='user0')
+
+
+@pytest.fixture
+def reader_client(reader):
+    client = APIClient()
+    client.force_authenticate(reader)
+    return client
+
+
+@pytest.fixture
+def anonymous_client(db):
+    return APIClient()
+
+
+@pytest.fixture
+def image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 800), '#E26C2D').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@pytest.fixture
+def timer():
+    @contextmanager
+    def max_seconds(limit):
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+        assert elapsed < limit, (
+            f'Запрос выполнялся {elapsed:.3f} с, допустимо {limit} с'
+        )
+    return max_seconds
@@ -0,0 +1,107 @@
+import io
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from PIL import Image
+from recipes.management.commands.explainqueries import sequential_scans
+from recipes.models import Ingredient, Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def load_ingredients(*args):
+    stdout = io.StringIO()
+    call_command('loadingredients', *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+def test_loadingredients_is_idempotent(django_assert_max_num_queries, timer):
+    count = Ingredient.objects.count()
+    last_modified = Ingredient.objects.latest('updated_at').updated_at
+    path = settings.BASE_DIR / 'data' / 'ingredients.json'
+    with django_assert_max_num_queries(16), timer(2.0):
+        output = load_ingredients(str(path))
+    assert f'0 inserted, {count} already present, 0 skipped' in output
+    assert Ingredient.objects.count() == count
+    assert Ingredient.objects.latest(
+        'updated_at'
+    ).updated_at == last_modified
+
+
+def test_loadingredients_reports_missing_file(tmp_path):
+    path = tmp_path / 'missing.json'
+    with pytest.raises(CommandError, match='missing.json'):
+        load_ingredients(str(path))
+
+
+def test_loadingredients_keeps_first_row(tmp_path):
+    path = tmp_path / 'ingredients.txt'
+    path.write_text(
+        'квас хлебный,мл\nквас хлебный,мл\nсоль,г\n', encoding='utf-8'
+    )
+    output = load_ingredients(str(path), '--format', 'csv')
+    assert '1 inserted, 1 already present, 0 skipped' in output
+    assert Ingredient.objects.filter(
+        name='квас хлебный', measurement_unit='мл'
+    ).count() == 1
+
+
+def test_loadingredients_skips_malformed_rows(tmp_path):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('квас хлебный,мл\nсоль\n,г\n', encoding='utf-8')
+    stderr = io.StringIO()
+    call_command(
+        'loadingredients', str(path), stdout=io.StringIO(), stderr=stderr
+    )
+    assert 'Skipped malformed row 2' in stderr.getvalue()
+    assert 'Skipped malformed row 3' in stderr.getvalue()
+    assert Ingredient.objects.filter(name='квас хлебный').exists()
+
+
+def test_generatethumbnails_backfills_versioned_thumbnails(settings):
+    recipe = Recipe.objects.first()
+    Recipe.objects.filter(pk=recipe.pk).update(image='recipes/backfill.png')
+    (settings.MEDIA_ROOT / 'recipes').mkdir()
+    Image.new('RGB', (800, 600), '#49B64E').save(
+        settings.MEDIA_ROOT / 'recipes' / 'backfill.png'
+    )
+    call_command(
+        'generatethumbnails', stdout=io.StringIO(), stderr=io.StringIO()
+    )
+    recipe.refresh_from_db()
+    version = recipe.thumbnail_version
+    assert version
+    thumbnails = set((settings.MEDIA_ROOT / 'recipes').rglob(f'*{version}*'))
+    assert len(thumbnails) == 3
+    call_command(
+        'generatethumbnails', '--force',
+        stdout=io.StringIO(), stderr=io.StringIO()
+    )
+    recipe.refresh_from_db()
+    assert recipe.thumbnail_version == version
+    assert set(
+        (settings.MEDIA_ROOT / 'recipes').rglob('thumbnails/*/*')
+    ) == thumbnails
+
+
+def test_explainqueries_finds_no_sequential_scans():
+    stdout = io.StringIO()
+    call_command('explainqueries', stdout=stdout)
+    assert 'All queries use indexes' in stdout.getvalue()
+
+
+def test_explainqueries_detects_sequential_scan(monkeypatch):
+    queryset = Recipe.objects.filter(text='Описание')
+    assert sequential_scans(queryset) == ['recipes_recipe']
+    assert sequential_scans(Recipe.objects.all()[:6]) == []
+    assert sequential_scans(
+        Recipe.objects.order_by('text')[:6]
+    ) == ['recipes_recipe']
+    monkeypatch.setattr(
+        'recipes.management.commands.explainqueries.canonical_queries',
+        lambda: {'recipe text': queryset}
+    )
+    with pytest.raises(CommandError, match='recipe text'):
+        call_command('explainqueries', stdout=io.StringIO())
@@ -0,0 +1,803 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from recipes import user_sets
+from recipes.models import Favorites, Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.trending import update_trending_scores
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = '/api/recipes/'
+
+User = get_user_model()
+
+
+@pytest.fixture
+def recipe_payload(image):
+    ingredients = Ingredient.objects.order_by('id')[:10]
+    return {
+        'tags': list(Tag.objects.values_list('id', flat=True)),
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 100}
+            for ingredient in ingredients
+        ],
+        'name': 'Новый рецепт',
+        'image': image,
+        'text': 'Описание нового рецепта',
+        'cooking_time': 30,
+    }
+
+
+@pytest.mark.parametrize('client_name', ['reader_client', 'anonymous_client'])
+def test_recipe_list(
+    request, client_name, django_assert_max_num_queries, timer
+):
+    client = request.getfixturevalue(client_name)
+    with django_assert_max_num_queries(5), timer(0.5):
+        response = client.get(RECIPES_URL, {'page': 100})
+    assert response.status_code == 200
+    assert len(response.data['results']) == 6
+
+
+def test_recipe_search(
+    anonymous_client, django_assert_max_num_queries, timer
+):
+    with django_assert_max_num_queries(5), timer(0.5):
+        response = anonymous_client.get(RECIPES_URL, {'search': 'рецепт 42'})
+    assert response.status_code == 200
+    assert response.data['results'][0]['name'] == 'Рецепт 429'
+    assert all(
+        recipe['name'].startswith('Рецепт 42')
+        for recipe in response.data['results']
+    )
+
+
+def test_recipe_search_by_ingredient(
+    reader_client, recipe_payload, django_capture_on_commit_callbacks
+):
+    ingredient = Ingredient.objects.create(
+        name='мангостин засахаренный', measurement_unit='г'
+    )
+    recipe_payload['ingredients'].append({'id': ingredient.id, 'amount': 5})
+    with django_capture_on_commit_callbacks(execute=True):
+        response = reader_client.post(
+            RECIPES_URL, recipe_payload, format='json'
+        )
+    recipe_id = response.data['id']
+    response = reader_client.get(RECIPES_URL, {'search': 'мангостин'})
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        recipe_id
+    ]
+    response = reader_client.get(RECIPES_URL, {'search': 'мангостиновый'})
+    assert not response.data['results']
+
+
+def test_recipe_pantry(
+    anonymous_client, django_assert_max_num_queries, timer
+):
+    recipe = Recipe.objects.get(name='Рецепт 100')
+    ingredient_ids = list(
+        recipe.ingredient_in_recipe.values_list('ingredient_id', flat=True)
+    )
+    anonymous_client.get(f'{RECIPES_URL}pantry/', {'ingredients': 1})
+    with django_assert_max_num_queries(3), timer(0.5):
+        response = anonymous_client.get(
+            f'{RECIPES_URL}pantry/',
+            {'ingredients': ingredient_ids[:6], 'limit': 20}
+        )
+    assert response.status_code == 200
+    assert 1 < len(response.data) <= 20
+    assert recipe.id in [
+        item['id'] for item in response.data
+        if (item['matched_ingredients'], item['missing_ingredients']) == (6, 2)
+    ]
+    matched = [item['matched_ingredients'] for item in response.data]
+    assert matched == sorted(matched, reverse=True)
+
+
+def test_recipe_pantry_sees_new_recipes(
+    reader_client, recipe_payload, django_capture_on_commit_callbacks
+):
+    ingredient_ids = [item['id'] for item in recipe_payload['ingredients']]
+    reader_client.get(f'{RECIPES_URL}pantry/', {'ingredients': 1})
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe_id = reader_client.post(
+            RECIPES_URL, recipe_payload, format='json'
+        ).data['id']
+    response = reader_client.get(
+        f'{RECIPES_URL}pantry/', {'ingredients': ingredient_ids}
+    )
+    assert response.data[0]['id'] == recipe_id
+    assert response.data[0]['missing_ingredients'] == 0
+
+
+def test_recipe_list_user_sets_cached(
+    reader_client, django_assert_max_num_queries,
+    django_capture_on_commit_callbacks
+):
+    reader_client.get(RECIPES_URL)
+    with django_assert_max_num_queries(4):
+        response = reader_client.get(RECIPES_URL, {'page': 500})
+    assert [recipe['is_favorited'] for recipe in response.data['results']] == [
+        True
+    ] * 6
+    recipe_id = response.data['results'][0]['id']
+    with django_capture_on_commit_callbacks() as callbacks:
+        reader_client.delete(f'{RECIPES_URL}{recipe_id}/favorite/')
+    response = reader_client.get(RECIPES_URL, {'page': 500})
+    assert response.data['results'][0]['is_favorited']
+    for callback in callbacks:
+        callback()
+    response = reader_client.get(RECIPES_URL, {'page': 500})
+    assert not response.data['results'][0]['is_favorited']
+
+
+def test_user_sets_loaded_before_commit_are_not_served(
+    reader, reader_client, monkeypatch, django_capture_on_commit_callbacks
+):
+    recipe_id = reader.favorites.values_list('recipe_id', flat=True).first()
+    url = f'{RECIPES_URL}{recipe_id}/'
+    load_user_sets = user_sets.load_user_sets
+
+    def load_then_commit(user, names):
+        # A concurrent writer commits after the sets were read.
+        loaded = load_user_sets(user, names)
+        monkeypatch.setattr(user_sets, 'load_user_sets', load_user_sets)
+        with django_capture_on_commit_callbacks(execute=True):
+            reader_client.delete(f'{url}favorite/')
+        return loaded
+
+    monkeypatch.setattr(user_sets, 'load_user_sets', load_then_commit)
+    assert reader_client.get(url).data['is_favorited']
+    assert not reader_client.get(url).data['is_favorited']
+
+
+@pytest.mark.parametrize('params, max_queries', [
+    ({'is_favorited': 1}, 5),
+    ({'is_in_shopping_cart': 1}, 5),
+    ({'tags': ['breakfast', 'lunch']}, 6),
+])
+def test_recipe_list_filtered(
+    reader_client, params, max_queries, django_assert_max_num_queries, timer
+):
+    with django_assert_max_num_queries(max_queries), timer(0.5):
+        response = reader_client.get(RECIPES_URL, params)
+    assert response.status_code == 200
+    assert response.data['results']
+
+
+def test_recipe_list_cursor_pagination(
+    reader_client, django_assert_max_num_queries, timer
+):
+    response = reader_client.get(RECIPES_URL, {'cursor': ''})
+    assert 'count' not in response.data
+    seen = [recipe['id'] for recipe in response.data['results']]
+    for _ in range(20):
+        with django_assert_max_num_queries(4), timer(0.5):
+            response = reader_client.get(response.data['next'])
+        seen.extend(recipe['id'] for recipe in response.data['results'])
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 126
+
+
+@pytest.mark.parametrize('params, key', [
+    ({'ordering': 'popular'}, lambda recipe: -recipe.favorites_count),
+    ({'ordering': 'cooking_time'}, lambda recipe: recipe.cooking_time),
+    ({'search': 'рецепт'}, None),
+])
+def test_recipe_list_cursor_pagination_ordered(
+    reader, reader_client, params, key
+):
+    # The cart holds every 30th recipe, so the feed is short but full of
+    # ties on the ordering field.
+    params = {'cursor': '', 'is_in_shopping_cart': 1, **params}
+    response = reader_client.get(RECIPES_URL, params)
+    seen = [recipe['id'] for recipe in response.data['results']]
+    pages = [response.data]
+    while response.data['next']:
+        response = reader_client.get(response.data['next'])
+        seen.extend(recipe['id'] for recipe in response.data['results'])
+        pages.append(response.data)
+    assert sorted(seen) == sorted(
+        reader.shopping_cart.values_list('recipe_id', flat=True)
+    )
+    if key is not None:
+        recipes = Recipe.objects.in_bulk(seen)
+        assert seen == sorted(seen, key=lambda pk: (key(recipes[pk]), -pk))
+    response = reader_client.get(pages[-1]['previous'])
+    assert response.data['results'] == pages[-2]['results']
+
+
+def test_recipe_list_cursor_pagination_whole_popular_feed(anonymous_client):
+    response = anonymous_client.get(
+        RECIPES_URL, {'cursor': '', 'ordering': 'popular'}
+    )
+    seen = [recipe['id'] for recipe in response.data['results']]
+    while response.data['next']:
+        response = anonymous_client.get(response.data['next'])
+        seen.extend(recipe['id'] for recipe in response.data['results'])
+    assert len(seen) == len(set(seen)) == Recipe.objects.count()
+
+
+def test_recipe_list_cursor_pagination_count(
+    reader_client, django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(5):
+        response = reader_client.get(
+            RECIPES_URL, {'cursor': '', 'count': 1}
+        )
+    assert response.data['count'] == 1000
+    assert not response.data['count_is_exact']
+    response = reader_client.get(
+        RECIPES_URL, {'cursor': '', 'count': 1, 'is_favorited': 1}
+    )
+    assert response.data['count'] == 500
+    assert response.data['count_is_exact']
+
+
+@pytest.mark.parametrize('ordering', ['popular', 'trending', 'cooking_time'])
+def test_recipe_list_ordering(
+    reader_client, ordering, django_assert_max_num_queries, timer
+):
+    update_trending_scores()
+    with django_assert_max_num_queries(5), timer(0.5):
+        response = reader_client.get(RECIPES_URL, {'ordering': ordering})
+    assert response.status_code == 200
+    first = response.data['results'][0]
+    if ordering == 'cooking_time':
+        assert first['cooking_time'] == 1
+    else:
+        assert first['is_favorited']
+    if ordering == 'trending':
+        assert first['is_in_shopping_cart']
+
+
+def test_update_trending_scores(django_assert_max_num_queries):
+    with django_assert_max_num_queries(10):
+        updated = update_trending_scores()
+    assert updated == Recipe.objects.filter(
+        Q(favorites__isnull=False) | Q(shopping_cart__isnull=False)
+    ).distinct().count()
+    assert Recipe.objects.filter(trending_score__gt=0).count() == updated
+
+
+def test_recipe_list_sees_tags_from_other_workers(reader_client):
+    reader_client.get(RECIPES_URL, {'tags': 'breakfast'})
+    # Saving through a queryset sends no signals, like a save in another
+    # worker: the local tag map stays stale.
+    tag, = Tag.objects.bulk_create(
+        [Tag(name='Полдник', color='#FFAA00', slug='snack')]
+    )
+    recipe = Recipe.objects.first()
+    recipe.tags.add(tag)
+    response = reader_client.get(RECIPES_URL, {'tags': 'snack'})
+    assert response.status_code == 200
+    assert [found['id'] for found in response.data['results']] == [recipe.id]
+    response = reader_client.get(RECIPES_URL, {'tags': 'unknown'})
+    assert response.status_code == 400
+
+
+def test_recipe_list_tags_without_duplicates(
+    anonymous_client, django_assert_max_num_queries
+):
+    anonymous_client.get(RECIPES_URL, {'tags': 'dinner'})
+    with django_assert_max_num_queries(5):
+        response = anonymous_client.get(
+            RECIPES_URL, {'tags': ['breakfast', 'lunch']}
+        )
+    assert response.data['count'] == Recipe.objects.count()
+    response = anonymous_client.get(RECIPES_URL, {'tags': 'unknown'})
+    assert response.status_code == 400
+
+
+def test_recipe_list_cached_representation(
+    reader_client, anonymous_client, django_assert_max_num_queries
+):
+    anonymous_client.get(RECIPES_URL, {'page': 500})
+    with django_assert_max_num_queries(3):
+        response = reader_client.get(RECIPES_URL, {'page': 500})
+    recipe = response.data['results'][-2]
+    assert recipe['is_favorited'] and recipe['author']['is_subscribed']
+    assert len(recipe['ingredients']) == 8
+    tag = Tag.objects.get(slug=recipe['tags'][0]['slug'])
+    tag.name = 'Полдник'
+    tag.save()
+    response = reader_client.get(RECIPES_URL, {'page': 500})
+    assert response.data['results'][-2]['tags'][0]['name'] == 'Полдник'
+
+
+def test_recipe_retrieve(reader_client, django_assert_max_num_queries, timer):
+    recipe = Recipe.objects.last()
+    with django_assert_max_num_queries(5), timer(0.2):
+        response = reader_client.get(f'{RECIPES_URL}{recipe.id}/')
+    assert response.status_code == 200
+    assert len(response.data['ingredients']) == 8
+
+
+def test_recipe_retrieve_not_modified(
+    reader, reader_client, django_assert_num_queries,
+    django_capture_on_commit_callbacks
+):
+    recipe = Recipe.objects.first()
+    url = f'{RECIPES_URL}{recipe.id}/'
+    etag = reader_client.get(url)['ETag']
+    with django_assert_num_queries(1):
+        response = reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        reader_client.post(f'{url}favorite/')
+    response = reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['is_favorited']
+
+
+def test_recipe_create(
+    reader_client, recipe_payload, django_assert_max_num_queries, timer
+):
+    with django_assert_max_num_queries(13), timer(1.0):
+        response = reader_client.post(
+            RECIPES_URL, recipe_payload, format='json'
+        )
+    assert response.status_code == 201
+    assert len(response.data['ingredients']) == 10
+
+
+def test_recipe_update_keeps_unchanged_ingredient_rows(
+    reader, reader_client, recipe_payload
+):
+    recipe = reader.recipes.first()
+    rows = list(recipe.ingredient_in_recipe.order_by('ingredient_id'))
+    recipe_payload['ingredients'] = [
+        {'id': row.ingredient_id, 'amount': row.amount + 1}
+        for row in rows[:-1]
+    ]
+    response = reader_client.patch(
+        f'{RECIPES_URL}{recipe.id}/', recipe_payload, format='json'
+    )
+    assert response.status_code == 200
+    updated = list(recipe.ingredient_in_recipe.order_by('ingredient_id'))
+    assert [row.id for row in updated] == [row.id for row in rows[:-1]]
+    assert all(
+        new.amount == old.amount + 1 for new, old in zip(updated, rows)
+    )
+
+
+def test_recipe_create_rejects_unknown_ingredient(
+    reader_client, recipe_payload
+):
+    recipe_payload['ingredients'].append({'id': 100500, 'amount': 1})
+    response = reader_client.post(RECIPES_URL, recipe_payload, format='json')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('tags, error', [
+    ([], 'may not be empty'),
+    ([1, 1], 'Теги должны быть уникальными'),
+    ([1, 100500], 'Тега не сущестует'),
+])
+def test_recipe_create_validates_tags(
+    reader_client, recipe_payload, tags, error
+):
+    recipe_payload['tags'] = tags
+    response = reader_client.post(RECIPES_URL, recipe_payload, format='json')
+    assert response.status_code == 400
+    assert error in str(response.data['tags'])
+
+
+def test_recipe_images_use_thumbnails(
+    reader_client, recipe_payload, settings
+):
+    response = reader_client.post(RECIPES_URL, recipe_payload, format='json')
+    detail_url = response.data['image']
+    assert '/thumbnails/detail/' in detail_url
+    thumbnail = detail_url.split(settings.MEDIA_URL, 1)[1]
+    assert (settings.MEDIA_ROOT / thumbnail).exists()
+    response = reader_client.get(RECIPES_URL)
+    assert '/thumbnails/card/' in response.data['results'][0]['image']
+
+
+def test_recipe_image_without_thumbnails_is_served_as_uploaded(
+    reader_client
+):
+    recipe = Recipe.objects.filter(thumbnail_version='').first()
+    response = reader_client.get(f'{RECIPES_URL}{recipe.id}/')
+    assert response.data['image'].endswith(f'/media/{recipe.image.name}')
+
+
+def test_recipe_image_replacement_swaps_thumbnails(
+    reader_client, recipe_payload, settings, django_capture_on_commit_callbacks
+):
+    def thumbnails():
+        return set(
+            path.relative_to(settings.MEDIA_ROOT)
+            for path in (settings.MEDIA_ROOT / 'recipes' / 'thumbnails').rglob(
+                '*.*'
+            )
+        )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = reader_client.post(
+            RECIPES_URL, recipe_payload, format='json'
+        )
+    url = f'{RECIPES_URL}{response.data["id"]}/'
+    created = thumbnails()
+    assert len(created) == 3
+    with django_capture_on_commit_callbacks(execute=True):
+        response = reader_client.patch(
+            url, {'name': 'Другое название'}, format='json'
+        )
+    assert response.status_code == 200
+    assert thumbnails() == created
+    with django_capture_on_commit_callbacks(execute=True):
+        response = reader_client.patch(url, recipe_payload, format='json')
+    assert response.status_code == 200
+    replaced = thumbnails()
+    assert len(replaced) == 3
+    assert not replaced & created
+    with django_capture_on_commit_callbacks(execute=True):
+        reader_client.delete(url)
+    assert not thumbnails()
+
+
+def test_recipe_update(
+    reader, reader_client, recipe_payload, django_assert_max_num_queries,
+    django_capture_on_commit_callbacks, timer
+):
+    recipe = reader.recipes.first()
+    rows = list(recipe.ingredient_in_recipe.order_by('id'))
+    kept = {row.ingredient_id for row in rows}
+    # Two rows change their amount, six are removed and three are added.
+    # The payload also replaces the image, so thumbnails are generated.
+    recipe_payload['ingredients'] = [
+        {'id': row.ingredient_id, 'amount': row.amount + 1}
+        for row in rows[:2]
+    ] + [
+        item for item in recipe_payload['ingredients']
+        if item['id'] not in kept
+    ][:3]
+    with django_assert_max_num_queries(24) as queries, timer(1.0):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = reader_client.patch(
+                f'{RECIPES_URL}{recipe.id}/', recipe_payload, format='json'
+            )
+    assert response.status_code == 200
+    assert len(response.data['ingredients']) == 5
+    row_writes = [
+        query['sql'].split()[0] for query in queries.captured_queries
+        if '"recipes_recipeingredient"' in query['sql'].split('WHERE')[0]
+        and not query['sql'].startswith('SELECT')
+    ]
+    assert sorted(row_writes) == ['DELETE', 'INSERT', 'UPDATE']
+
+
+def test_recipe_ingredient_removal_refreshes_recipe(
+    reader, reader_client, recipe_payload, django_capture_on_commit_callbacks
+):
+    recipe = reader.recipes.first()
+    url = f'{RECIPES_URL}{recipe.id}/'
+    rows = list(recipe.ingredient_in_recipe.select_related('ingredient'))
+    removed = rows[0].ingredient
+    response = reader_client.get(RECIPES_URL, {'search': removed.name})
+    assert recipe.id in [found['id'] for found in response.data['results']]
+    pantry_url = f'{RECIPES_URL}pantry/'
+    response = reader_client.get(
+        pantry_url, {'ingredients': removed.id, 'limit': 100}
+    )
+    assert recipe.id in [found['id'] for found in response.data]
+    recipe_payload['ingredients'] = [
+        {'id': row.ingredient_id, 'amount': row.amount} for row in rows[1:]
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        response = reader_client.patch(url, recipe_payload, format='json')
+    assert response.status_code == 200
+    assert len(reader_client.get(url).data['ingredients']) == len(rows) - 1
+    response = reader_client.get(RECIPES_URL, {'search': removed.name})
+    assert recipe.id not in [
+        found['id'] for found in response.data['results']
+    ]
+    response = reader_client.get(
+        pantry_url, {'ingredients': removed.id, 'limit': 100}
+    )
+    assert recipe.id not in [found['id'] for found in response.data]
+
+
+def test_ingredient_delete_refreshes_recipes_once(
+    reader_client, django_assert_max_num_queries,
+    django_capture_on_commit_callbacks
+):
+    ingredient = Ingredient.objects.filter(recipes__isnull=False).first()
+    recipe_ids = set(ingredient.recipes.values_list('id', flat=True))
+    url = f'{RECIPES_URL}{min(recipe_ids)}/'
+    count = len(reader_client.get(url).data['ingredients'])
+    pantry_query = {'ingredients': ingredient.id, 'limit': 100}
+    reader_client.get(f'{RECIPES_URL}pantry/', pantry_query)
+    with django_assert_max_num_queries(9):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            ingredient.delete()
+    assert len(callbacks) == 3
+    assert len(reader_client.get(url).data['ingredients']) == count - 1
+    response = reader_client.get(f'{RECIPES_URL}pantry/', pantry_query)
+    assert not recipe_ids & {found['id'] for found in response.data}
+
+
+def test_favorite_and_cart_counters(reader_client):
+    recipe = Recipe.objects.first()
+    url = f'{RECIPES_URL}{recipe.id}/'
+    reader_client.post(f'{url}favorite/')
+    reader_client.post(f'{url}shopping_cart/')
+    recipe.refresh_from_db()
+    assert (recipe.favorites_count, recipe.cart_count) == (1, 1)
+    reader_client.delete(f'{url}favorite/')
+    reader_client.delete(f'{url}shopping_cart/')
+    recipe.refresh_from_db()
+    assert (recipe.favorites_count, recipe.cart_count) == (0, 0)
+
+
+def test_favorite_add_and_remove_single_statement(
+    reader_client, django_assert_max_num_queries
+):
+    recipe = Recipe.objects.first()
+    url = f'{RECIPES_URL}{recipe.id}/favorite/'
+    with django_assert_max_num_queries(5):
+        response = reader_client.post(url)
+    assert response.status_code == 201
+    assert reader_client.post(url).status_code == 400
+    favorite = Favorites.objects.get(recipe=recipe)
+    assert favorite.created_at is not None
+    with django_assert_max_num_queries(4):
+        response = reader_client.delete(url)
+    assert response.status_code == 204
+    assert reader_client.delete(url).status_code == 403
+    response = reader_client.post(f'{RECIPES_URL}100500/favorite/')
+    assert response.status_code == 404
+
+
+def test_shopping_cart_bulk(
+    reader, reader_client, django_assert_max_num_queries
+):
+    url = f'{RECIPES_URL}shopping_cart/bulk/'
+    ids = list(
+        Recipe.objects.order_by('-id').values_list('id', flat=True)[:50]
+    )
+    in_cart = set(reader.shopping_cart.values_list('recipe_id', flat=True))
+    with django_assert_max_num_queries(6):
+        response = reader_client.post(
+            url, {'ids': [*ids, 100500]}, format='json'
+        )
+    assert response.status_code == 200
+    statuses = [item['status'] for item in response.data['results']]
+    assert statuses == [
+        'exists' if recipe_id in in_cart else 'added' for recipe_id in ids
+    ] + ['not_found']
+    assert Recipe.objects.get(id=ids[0]).cart_count == 1
+    response = reader_client.get(RECIPES_URL, {'is_in_shopping_cart': 1})
+    assert response.data['results'][0]['is_in_shopping_cart']
+    response = reader_client.post(url, {'ids': ids[:2]}, format='json')
+    assert [item['status'] for item in response.data['results']] == [
+        'exists', 'exists'
+    ]
+    response = reader_client.delete(url, {'ids': ids}, format='json')
+    assert {item['status'] for item in response.data['results']} == {
+        'removed'
+    }
+    assert Recipe.objects.get(id=ids[0]).cart_count == 0
+    assert not reader.shopping_cart.filter(recipe_id__in=ids).exists()
+    response = reader_client.post(url, {'ids': [1, 1]}, format='json')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('export_format, content_type', [
+    ('txt', 'text/plain; charset=utf-8'),
+    ('csv', 'text/csv; charset=utf-8'),
+    ('pdf', 'application/pdf'),
+])
+def test_download_shopping_cart(
+    reader_client, export_format, content_type,
+    django_assert_max_num_queries, django_assert_num_queries, timer
+):
+    url = f'{RECIPES_URL}download_shopping_cart/'
+    with django_assert_max_num_queries(8), timer(1.0):
+        response = reader_client.get(url, {'format': export_format})
+        content = b''.join(response.streaming_content)
+    assert response.status_code == 200
+    assert response['Content-Type'] == content_type
+    assert content
+    with django_assert_num_queries(2):
+        response = reader_client.get(url, {'format': export_format})
+        repeated = b''.join(response.streaming_content)
+    if export_format != 'pdf':
+        assert repeated == content
+
+
+def test_download_empty_shopping_cart(django_assert_num_queries):
+    user = User.objects.create_user(
+        username='empty', email='empty@foodgram.ru', password='password'
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    url = f'{RECIPES_URL}download_shopping_cart/'
+    for _ in range(2):
+        with django_assert_num_queries(2):
+            response = client.get(url, {'format': 'txt'})
+        assert response.status_code == 400
+
+
+def test_download_shopping_cart_converts_units_and_servings(
+    django_assert_max_num_queries
+):
+    user = User.objects.create_user(
+        username='cook', email='cook@foodgram.ru', password='password'
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    grams = Ingredient.objects.create(name='ядро кешью', measurement_unit='г')
+    kilograms = Ingredient.objects.create(
+        name='ядро кешью', measurement_unit='кг'
+    )
+    recipes = Recipe.objects.order_by('id')[:2]
+    RecipeIngredient.objects.create(
+        recipe=recipes[0], ingredient=grams, amount=500
+    )
+    RecipeIngredient.objects.create(
+        recipe=recipes[1], ingredient=kilograms, amount=2
+    )
+    url = f'{RECIPES_URL}{recipes[1].id}/shopping_cart/'
+    assert client.post(url, {'servings': 2}).status_code == 201
+    url = f'{RECIPES_URL}{recipes[0].id}/shopping_cart/'
+    assert client.post(url).status_code == 201
+    response = client.patch(url, {'servings': 3})
+    assert response.data == {'servings': 3}
+    assert client.patch(url, {'servings': 0}).status_code == 400
+    missing_id = Recipe.objects.order_by('-id').first().id
+    response = client.patch(
+        f'{RECIPES_URL}{missing_id}/shopping_cart/',
+        {'servings': 3}
+    )
+    assert response.status_code == 404
+    with django_assert_max_num_queries(8):
+        content = b''.join(client.get(
+            f'{RECIPES_URL}download_shopping_cart/', {'format': 'txt'}
+        ).streaming_content).decode()
+    assert '- ядро кешью (г) - 5500' in content
+    assert '(кг)' not in content
+
+
+def test_shopping_list_follows_cart_and_recipe_changes(
+    reader, reader_client, django_capture_on_commit_callbacks
+):
+    def download():
+        return b''.join(reader_client.get(
+            f'{RECIPES_URL}download_shopping_cart/', {'format': 'txt'}
+        ).streaming_content).decode()
+
+    def item_line(item):
+        return (
+            f'- {item.ingredient.name} '
+            f'({item.ingredient.measurement_unit}) - '
+        )
+
+    def change(method, url, data=None):
+        with django_capture_on_commit_callbacks(execute=True):
+            getattr(reader_client, method)(url, data)
+
+    carted = reader.shopping_cart.values_list('recipe_id', flat=True)
+    recipe = Recipe.objects.exclude(id__in=carted).first()
+    cart_url = f'{RECIPES_URL}{recipe.id}/shopping_cart/'
+    item = recipe.ingredient_in_recipe.select_related('ingredient').first()
+    assert item_line(item) not in download()
+    with django_capture_on_commit_callbacks() as callbacks:
+        reader_client.post(cart_url)
+    assert item_line(item) not in download()
+    for callback in callbacks:
+        callback()
+    assert item_line(item) in download()
+    ingredient = Ingredient.objects.create(
+        name='ядро макадамии', measurement_unit='г'
+    )
+    # Ingredient rows are written together with their recipe.
+    with django_capture_on_commit_callbacks(execute=True):
+        added = RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=7
+        )
+        recipe.save()
+    assert '- ядро макадамии (г) - 7' in download()
+    change('patch', cart_url, {'servings': 2})
+    assert '- ядро макадамии (г) - 14' in download()
+    with django_capture_on_commit_callbacks(execute=True):
+        added.delete()
+        recipe.save()
+    assert 'ядро макадамии' not in download()
+    with django_capture_on_commit_callbacks(execute=True):
+        item.ingredient.delete()
+    assert item_line(item) not in download()
+    in_cart = download()
+    change('delete', cart_url)
+    assert download() != in_cart
+
+
+@pytest.mark.parametrize('name', ['а', 'сах', 'несуществующий'])
+def test_ingredient_search(
+    anonymous_client, name, django_assert_num_queries, timer
+):
+    anonymous_client.get('/api/ingredients/', {'name': 'а'})
+    with django_assert_num_queries(0), timer(0.1):
+        response = anonymous_client.get('/api/ingredients/', {'name': name})
+    assert response.status_code == 200
+
+
+def test_ingredient_search_matches_prefix_only_by_default(anonymous_client):
+    response = anonymous_client.get('/api/ingredients/', {'name': 'а'})
+    assert all(
+        ingredient['name'].casefold().startswith('а')
+        for ingredient in response.data
+    )
+    response = anonymous_client.get(
+        '/api/ingredients/', {'name': 'а', 'contains': 1}
+    )
+    assert all(
+        ingredient['name'].casefold().startswith('а')
+        for ingredient in response.data
+    )
+
+
+def test_ingredient_search_ranks_prefix_matches_first(anonymous_client):
+    response = anonymous_client.get(
+        '/api/ingredients/', {'name': 'САХ', 'contains': 'true'}
+    )
+    names = [ingredient['name'].casefold() for ingredient in response.data]
+    prefixed = [name.startswith('сах') for name in names]
+    assert all(prefixed[:prefixed.count(True)])
+    assert all('сах' in name for name in names)
+    assert any(not is_prefixed for is_prefixed in prefixed)
+
+
+def test_ingredient_search_sees_new_ingredients(anonymous_client):
+    anonymous_client.get('/api/ingredients/', {'name': 'сах'})
+    Ingredient.objects.create(name='сахарная пудра с корицей',
+                              measurement_unit='г')
+    response = anonymous_client.get('/api/ingredients/', {'name': 'сах'})
+    assert 'сахарная пудра с корицей' in [
+        ingredient['name'] for ingredient in response.data
+    ]
+
+
+def test_ingredient_list(
+    anonymous_client, django_assert_max_num_queries, timer
+):
+    with django_assert_max_num_queries(2), timer(0.5):
+        response = anonymous_client.get('/api/ingredients/')
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('url, params', [
+    ('/api/ingredients/', {}),
+    ('/api/ingredients/', {'name': 'сах'}),
+    ('/api/tags/', {}),
+])
+def test_reference_data_not_modified(anonymous_client, url, params):
+    response = anonymous_client.get(url, params)
+    assert not response.has_header('Last-Modified')
+    response = anonymous_client.get(
+        url, params, HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert response.status_code == 304
+
+
+def test_tag_delete_invalidates_etag(anonymous_client):
+    etag = anonymous_client.get('/api/tags/')['ETag']
+    Tag.objects.create(name='Полдник', color='#FFAA00', slug='snack').delete()
+    response = anonymous_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    Tag.objects.first().delete()
+    response = anonymous_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+def test_tag_change_invalidates_etag(anonymous_client):
+    etag = anonymous_client.get('/api/tags/')['ETag']
+    tag = Tag.objects.first()
+    tag.name = 'Полдник'
+    tag.save()
+    response = anonymous_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
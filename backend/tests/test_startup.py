@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+HEAVY_MODULES = ('pandas', 'numpy', 'reportlab')
+
+
+def imported_modules():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', 'manage.py', 'check'],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'tests.settings'},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        if self_time.strip().isdigit():
+            yield name.strip()
+
+
+def test_check_does_not_import_heavy_modules():
+    heavy = [
+        name for name in imported_modules()
+        if name.split('.')[0] in HEAVY_MODULES
+    ]
+    assert not heavy
@@ -0,0 +1,85 @@
+import pytest
+from django.contrib.auth import get_user_model
+from recipes.counters import recount_counters
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+@pytest.mark.parametrize('params', [{}, {'recipes_limit': 3}])
+def test_subscriptions(
+    reader_client, params, django_assert_max_num_queries, timer
+):
+    with django_assert_max_num_queries(3), timer(0.5):
+        response = reader_client.get(SUBSCRIPTIONS_URL, params)
+    assert response.status_code == 200
+    assert len(response.data['results']) == 6
+    for author in response.data['results']:
+        assert author['recipes_count'] == 60
+        assert len(author['recipes']) == params.get('recipes_limit', 60)
+
+
+def test_subscriptions_cursor_pagination(
+    reader_client, django_assert_max_num_queries
+):
+    response = reader_client.get(SUBSCRIPTIONS_URL, {'cursor': ''})
+    ids = [author['id'] for author in response.data['results']]
+    while response.data['next']:
+        with django_assert_max_num_queries(3):
+            response = reader_client.get(response.data['next'])
+        ids.extend(author['id'] for author in response.data['results'])
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == 30
+
+
+def test_subscribe_updates_followers_count(reader_client):
+    author = User.objects.get(username='user49')
+    url = f'/api/users/{author.id}/subscribe/'
+    reader_client.post(url)
+    author.refresh_from_db()
+    assert author.followers_count == 1
+    reader_client.delete(url)
+    author.refresh_from_db()
+    assert author.followers_count == 0
+
+
+def test_subscribe_bulk(reader, reader_client):
+    url = '/api/users/subscribe/bulk/'
+    ids = list(User.objects.filter(
+        username__in=['user1', 'user40', 'user41']
+    ).values_list('id', flat=True))
+    response = reader_client.post(url, {'ids': ids}, format='json')
+    assert [item['status'] for item in response.data['results']] == [
+        'exists', 'added', 'added'
+    ]
+    assert User.objects.get(id=ids[1]).followers_count == 1
+    response = reader_client.get(f'/api/users/{ids[1]}/')
+    assert response.data['is_subscribed']
+    response = reader_client.delete(url, {'ids': ids[1:]}, format='json')
+    assert {item['status'] for item in response.data['results']} == {
+        'removed'
+    }
+    response = reader_client.post(url, {'ids': [reader.id]}, format='json')
+    assert response.status_code == 400
+
+
+def test_recount_counters(django_assert_max_num_queries):
+    User.objects.update(recipes_count=0, followers_count=0)
+    with django_assert_max_num_queries(4):
+        recount_counters()
+    assert User.objects.get(username='user1').followers_count == 1
+    assert User.objects.get(username='user1').recipes_count == 60
+
+
+def test_user_list(reader_client, django_assert_max_num_queries, timer):
+    with django_assert_max_num_queries(3), timer(0.2):
+        response = reader_client.get('/api/users/')
+    assert response.status_code == 200
+    assert [user['is_subscribed'] for user in response.data['results']] == [
+        False, True, True, True, True, True
+    ]
+    with django_assert_max_num_queries(2):
+        reader_client.get('/api/users/', {'page': 2})
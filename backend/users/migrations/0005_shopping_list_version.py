@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='shopping_list_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия списка покупок'),
+        ),
+    ]
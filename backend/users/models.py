@@ -20,6 +20,21 @@ class User(AbstractUser):
         verbose_name='Пароль',
         max_length=150
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
+    shopping_list_version = models.PositiveIntegerField(
+        verbose_name='Версия списка покупок',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ['id']